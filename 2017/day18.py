@@ -22,164 +22,105 @@
  are deadlocked, they terminate. How many times program '1' sent a value?
 """
 
-from itertools import count
-from threading import Thread
-from queue import Queue, Empty
-
-class Duet(object):
-    """ Class for the Duet object, with instructions and registers """
+from collections import deque
+
+from machine import InstructionSet, Machine
+
+# Arithmetic commands, shared by both parts
+ARITHMETIC = dict(
+        set='reg[x] = reg[y]',
+        add='reg[x] += reg[y]',
+        mul='reg[x] *= reg[y]',
+        mod='reg[x] %= reg[y]',
+        jgz="""
+if reg[x] > 0:
+    counter += reg[y]
+    continue
+""",
+)
+
+# Sounds are played, and recovered if X is not zero
+SOUND = InstructionSet(
+        **ARITHMETIC,
+        snd='self.last_played = reg[x]',
+        rcv="""
+if reg[x]:
+    self.recovered = self.last_played
+    break
+""",
+)
+
+# Values are sent to the outbox, and received from the inbox
+DUET = InstructionSet(
+        **ARITHMETIC,
+        snd="""
+self.outbox.append(reg[x])
+self.sent += 1
+""",
+        rcv="""
+if not self.inbox:
+    break
+reg[x] = self.inbox.popleft()
+""",
+)
+
+class Duet(Machine):
+    """ Program playing sounds, stopped by the first one recovered """
     def __init__(self, instructions):
-        self.reg = { key: 0 for key in 'abcdefghijklmnopqrstuvwxyz' }
+        super().__init__(SOUND, instructions)
         self.last_played = 0
-        self.counter = 0
-        self.instructions = instructions
-
-    def value(self, x):
-        """ Get the value of a register or number """
-        try:
-            return int(x)
-        except ValueError:
-            return self.reg[x]
-
-    def snd(self, x):
-        """ execute snd command """
-        self.last_played = self.value(x)
-
-    def set(self, x, y):
-        """ execute set command """
-        self.reg[x] = self.value(y)
-
-    def add(self, x, y):
-        """ execute add command """
-        self.reg[x] += self.value(y)
-
-    def mul(self, x, y):
-        """ execute mul command """
-        self.reg[x] *= self.value(y)
-
-    def mod(self, x, y):
-        """ execute mod command """
-        self.reg[x] = self.value(x) % self.value(y)
-
-    def rcv(self, x):
-        """ execute rcv command """
-        if self.value(x):
-            return self.last_played
-        return None
-
-    def jgz(self, x, y):
-        """ execute jgz command """
-        if self.value(x) > 0:
-            self.counter += self.value(y) - 1
-
-    def execute(self, instruction):
-        """ execute an instruction """
-        command, *args = instruction.rstrip().split(' ')
-        ret = None
-        # Execute command
-        if command == 'snd':
-            ret = self.snd(*args)
-        elif command == 'set':
-            ret = self.set(*args)
-        elif command == 'add':
-            ret = self.add(*args)
-        elif command == 'mul':
-            ret = self.mul(*args)
-        elif command == 'mod':
-            ret = self.mod(*args)
-        elif command == 'rcv':
-            ret = self.rcv(*args)
-        elif command == 'jgz':
-            ret = self.jgz(*args)
-
-        self.counter += 1
-
-        return ret
+        self.recovered = None
+
+class DuetProcess(Machine):
+    """ Program sending values to an outbox and receiving them from its
+    inbox, run until it has to wait for a value """
+    def __init__(self, instructions, id):
+        super().__init__(DUET, instructions)
+        self.id = id
+        self['p'] = id
+        self.inbox = deque()
+        self.outbox = None
+        self.sent = 0
 
     def run(self):
-        """ Start execution """
-        while (self.counter < len(self.instructions)):
-            self.execute(self.instructions[self.counter])
-
-
-def load_and_run(filename, func):
+        """ Run until the end, or a rcv on an empty inbox. Return whether
+        any instruction was executed """
+        counter, sent = self.counter, self.sent
+        super().run()
+        return self.counter != counter or self.sent != sent
+
+def run_ring(instructions, n_programs):
+    """ Run n programs in a ring, each one sending to the next one, until
+    all of them ended or wait for values. Return the programs """
+    programs = [DuetProcess(instructions, id) for id in range(n_programs)]
+    for program, next_program in zip(programs, programs[1:] + programs[:1]):
+        program.outbox = next_program.inbox
+    # Round robin, programs run until they block. Without progress in a
+    # round, all of them wait on empty inboxes (or ended): a deadlock
+    while any([program.run() for program in programs]):
+        pass
+    return programs
+
+
+def load_and_run(filename, func, *args):
     """ Load the file and run the function """
     with open(filename) as f:
         instructions = f.readlines()
-    return func(instructions)
+    return func(instructions, *args)
 
 def get_recover(program):
     """ Return the first value recovered by recover function """
-    class DuetPartOne(Duet):
-        def run(self):
-            """ Start execution """
-            while (self.counter < len(self.instructions)):
-                ret = self.execute(self.instructions[self.counter])
-                if ret is not None:
-                    return ret
-    duet = DuetPartOne(program)
-    return duet.run()
+    duet = Duet(program)
+    duet.run()
+    return duet.recovered
+
+def get_sent(program, n_programs):
+    """ Return the number of values sent by each program of a ring """
+    return [process.sent for process in run_ring(program, n_programs)]
 
 def get_send_program_1(program):
     """ Return the number of times program '1' sent a value """
-    class DuetPartTwo(Duet):
-        ids = count(0)
-        def __init__(self, instructions):
-            super().__init__(instructions)
-            self.id = next(self.ids)
-            self.reg['p'] = self.id
-            self.queue = Queue()
-            self.other = None
-            self.receiving = False
-            self.terminate = False
-            self.sent = 0
-
-        def set_other(self, other):
-            """ Set the other program """
-            self.other = other
-
-        def snd(self, x):
-            """ Send the value to the other program """
-            if self.other:
-                self.other.queue.put(self.value(x))
-                self.sent += 1
-
-        def rcv(self, x):
-            """ Receive the value from the queue """
-            # If the other is blocking and the queue is empty, terminate
-            self.receiving = True
-            while True:
-                try:
-                    self.reg[x] = self.queue.get(timeout=1)
-                    break
-                except Empty:
-                    # Check if the other thread is blocked too
-                    if self.other.receiving and self.other.queue.empty():
-                        self.terminate = True
-                        return 
-            self.receiving = False
-
-        def run(self):
-            """ Start execution """
-            while (not self.terminate and self.counter < len(self.instructions)):
-                self.execute(self.instructions[self.counter])
-
-    duet_0 = DuetPartTwo(program)
-    duet_1 = DuetPartTwo(program)
-
-    duet_1.set_other(duet_0)
-    duet_0.set_other(duet_1)
-
-    # Start threads
-    duet_0_t = Thread(target=duet_0.run)
-    duet_1_t = Thread(target=duet_1.run)
-    duet_0_t.start()
-    duet_1_t.start()
-
-    duet_0_t.join()
-    duet_1_t.join()
-
-    return duet_1.sent
+    return get_sent(program, 2)[1]
 
 def test(truth, check_function, *args):
     for test_input, result in truth:
@@ -193,6 +134,14 @@ if __name__ == "__main__":
     # Test for PART 1
     GROUND_TRUTH = (('day18_test.txt', 4),)
     test(GROUND_TRUTH, load_and_run, get_recover)
+    # Test for PART 2
+    GROUND_TRUTH = (('day18_test2.txt', 3),)
+    test(GROUND_TRUTH, load_and_run, get_send_program_1)
+    # Test for rings of more programs, the ones of day18_test3.txt end
+    GROUND_TRUTH = (('day18_test2.txt', [3, 3, 3]), ('day18_test3.txt', [1, 1, 2]))
+    test(GROUND_TRUTH, load_and_run, get_sent, 3)
+    GROUND_TRUTH = (('day18_test3.txt', [1, 1, 2, 3, 4]),)
+    test(GROUND_TRUTH, load_and_run, get_sent, 5)
     # RUN
     print('PART 1 result: {}'.format(load_and_run('day18.txt', get_recover)))
     print('PART 2 result: {}'.format(load_and_run('day18.txt', get_send_program_1)))
@@ -15,119 +15,151 @@
  Register 'a' starts at 1. What's the final value of h?
 """
 
-import day18
-
-class Processor(day18.Duet):
-    def __init__(self, instructions):
-        super().__init__(instructions)
-        # override the registers used
-        self.mul_counter = 0
-        self.reg = { key: 0 for key in 'abcdefgh' }
-
-    def sub(self, x, y):
-        """ execute sub command """
-        self.reg[x] -= self.value(y)
-
-    def jnz(self, x, y):
-        """ execute jnz command """
-        if self.value(x) != 0:
-            self.counter += self.value(y) - 1
-
-    def execute(self, instruction):
-        """ execute an instruction """
-        print(self.counter)
-        command, *args = instruction.rstrip().split(' ')
-        ret = None
-        # Execute command
-        if command == 'set':
-            ret = self.set(*args)
-        elif command == 'sub':
-            ret = self.sub(*args)
-        elif command == 'mul':
-            ret = self.mul(*args)
-        elif command == 'jnz':
-            ret = self.jnz(*args)
-        self.counter += 1
-        return ret
+import re
+import math
+from collections import namedtuple
+
+from machine import InstructionSet, Machine
+
+# Registers of the coprocessor
+REGISTERS = 'abcdefgh'
+
+COMMANDS = dict(
+        set='reg[x] = reg[y]',
+        sub='reg[x] -= reg[y]',
+        mul='reg[x] *= reg[y]',
+        jnz="""
+if reg[x]:
+    counter += reg[y]
+    continue
+""",
+)
+
+COPROCESSOR = InstructionSet(**COMMANDS)
+
+# Loop setting f to 0 if d * e equals b, for any d from its value and e from 2,
+# both below b. It ends with d and e equal to b, and g to 0
+DIVISOR_LOOP = """
+set {e} 2
+set {g} {d}
+mul {g} {e}
+sub {g} {b}
+jnz {g} 2
+set {f} 0
+sub {e} -1
+set {g} {e}
+sub {g} {b}
+jnz {g} -8
+sub {d} -1
+set {g} {d}
+sub {g} {b}
+jnz {g} -13
+""".strip().split('\n')
+
+def get_template_regex(template):
+    """ Get the regex matching the lines of a template, whose fields are
+    registers, the same in all their occurrences """
+    seen = set()
+    def field(match):
+        name = match.group(1)
+        if name in seen:
+            return '(?P={})'.format(name)
+        seen.add(name)
+        return '(?P<{}>[a-z])'.format(name)
+    return re.compile(re.sub(
+        r'\\\{(\w+)\\\}', field, re.escape('\n'.join(template))))
+
+def has_divisor(n, low, high):
+    """ Check if n has a divisor between low and high """
+    for d in range(2, math.isqrt(n) + 1):
+        if n % d == 0 and (low <= d <= high or low <= n // d <= high):
+            return True
+    return False
+
+# Indexes of the registers of a divisor loop
+Loop = namedtuple('Loop', 'b d e f g')
+
+# Coprocessor with the divisor loops replaced: their first instruction runs
+# them at once when they end, else it only sets e
+OPTIMIZED = InstructionSet(
+        **COMMANDS,
+        divisor_loop="""
+if (reg[self.loops[counter].b] > 2
+        and reg[self.loops[counter].b] > reg[self.loops[counter].d]):
+    if self.has_divisor(reg[self.loops[counter].b],
+            max(reg[self.loops[counter].d], 2), reg[self.loops[counter].b] // 2):
+        reg[self.loops[counter].f] = 0
+    reg[self.loops[counter].d] = reg[self.loops[counter].b]
+    reg[self.loops[counter].e] = reg[self.loops[counter].b]
+    reg[self.loops[counter].g] = 0
+    counter += {}
+    continue
+reg[self.loops[counter].e] = 2
+""".format(len(DIVISOR_LOOP)),
+)
+
+class OptimizedProcessor(Machine):
+    """ Coprocessor running a program whose divisor loops are replaced """
+    has_divisor = staticmethod(has_divisor)
+
+    def __init__(self, lines):
+        lines, loops = optimize(lines)
+        super().__init__(OPTIMIZED, lines, REGISTERS)
+        # registers of the loop starting at each divisor_loop
+        self.loops = {
+                start: Loop(*map(REGISTERS.index, registers))
+                for start, registers in loops.items()
+        }
+
+def optimize(lines):
+    """ Replace the first instruction of the divisor loops of a program by
+    divisor_loop. Return the new lines, and the registers b, d, e, f and g
+    of the loop starting at each divisor_loop """
+    regex = get_template_regex(DIVISOR_LOOP)
+    lines = [line.strip() for line in lines]
+    loops = {}
+    for start in range(len(lines) - len(DIVISOR_LOOP) + 1):
+        match = regex.fullmatch('\n'.join(lines[start:start + len(DIVISOR_LOOP)]))
+        if match and len(set(match.group('b', 'd', 'e', 'f', 'g'))) == 5:
+            loops[start] = match.group('b', 'd', 'e', 'f', 'g')
+            lines[start] = 'divisor_loop'
+    return lines, loops
+
+def check_optimization(max_b=20):
+    """ Run the divisor loop from small values of its registers, unchanged
+    and optimized, and return the values after which their registers differ """
+    loop = [line.format(b='b', d='d', e='e', f='f', g='g') for line in DIVISOR_LOOP]
+    mismatches = []
+    for b in range(3, max_b):
+        for d in range(-2, b):
+            for f in (0, 1):
+                processors = Machine(COPROCESSOR, loop, REGISTERS), OptimizedProcessor(loop)
+                for processor in processors:
+                    processor['b'], processor['d'], processor['f'] = b, d, f
+                    processor.run()
+                unchanged, optimized = (
+                        [processor[r] for r in REGISTERS] for processor in processors)
+                if unchanged != optimized:
+                    mismatches.append((b, d, f))
+    return mismatches
+
+def get_counts(lines):
+    """ get the number of times each instruction is executed """
+    processor = Machine(COPROCESSOR, lines, REGISTERS, count=True)
+    processor.run()
+    return processor.get_counts()
 
 def get_number_mul(lines):
     """ get the number of times the 'mul' instruction is executed """
-    class ProcessorPartOne(Processor):
-        def __init__(self, instructions):
-            super().__init__(instructions)
-            self.mul_counter = 0
-
-        def mul(self, x, y):
-            """ execute mul command """
-            self.mul_counter += 1
-            super().mul(x, y)
-
-    processor = ProcessorPartOne(lines)
-    processor.run()
-    return processor.mul_counter
+    return get_counts(lines)['mul']
 
 def get_final_value_h(lines):
-    """ get the final value of register 'h' """
-    class ProcessorPartTwo(Processor):
-        def __init__(self, instructions):
-            super().__init__(instructions)
-            self.reg['a'] = 1
-
-    # TODO: must optimize program
-    processor = ProcessorPartTwo(lines)
+    """ get the final value of register 'h', with the divisor loops of the
+    program optimized """
+    processor = OptimizedProcessor(lines)
+    processor['a'] = 1
     processor.run()
-    return processor.reg['h']
-
-def get_final_value_h_optimized():
-    """ OPTIMIZED BY HAND """
-    h = 0
-    b = 65
-    c = b
-    b *= 100
-    b -= -100000
-    c = b
-    c -= -17000
-    while True:
-        f = 1
-        d = 2
-        while True:
-            e = 2
-#            while True:
-#                g = d
-#                g *= e
-#                g -= b
-#                if g == 0:
-#                    f = 0
-#                e -= -1
-#                g = e
-#                g -= b
-#                if g == 0:
-#                    break
-            # Equivalent to:
-            # In this block, the only variable that changes is e (incremented by 1)
-            # at each iteration, and the break condition is that e == b, then e
-            # will always equal b at some point (b is a large integer, and e always
-            # starts at 2). Then, it remains to reduce when is f set to 0. It is set
-            # to 0 when e*d == b. But then, since e can be any integer, except 1 (starts
-            # at 2), then b must be divisible by d. Not only that, since d changes value
-            # out of the loop, and b too, we must ensure that b is greater than e*b on
-            # the first iteration (with e = 2).
-            if (b % d) == 0 and b >= (e*d):
-                f = 0
-
-            d -= -1
-            g = d
-            g -= b
-            if g == 0:
-                break
-        if f == 0:
-            h -= -1
-        g = b
-        g -= c
-        if g == 0:
-            return h
-        b -= -17
-
+    return processor['h']
 
 def load_and_run(filename, func, *args):
     """ Load the file and run the function """
@@ -145,6 +177,15 @@ def test(truth, check_function, *args):
                     check_function.__name__, test_input, result, expected_result))
 
 if __name__ == "__main__":
+    # Test for PART 1
+    GROUND_TRUTH = (('day23_test.txt', dict(set=1, sub=3, mul=3, jnz=3)),)
+    test(GROUND_TRUTH, load_and_run, get_counts)
+    GROUND_TRUTH = (('day23_test.txt', 3),)
+    test(GROUND_TRUTH, load_and_run, get_number_mul)
+    # Test for PART 2
+    print('Optimization mismatches: {}'.format(check_optimization()))
+    GROUND_TRUTH = (('day23.txt', 917),)
+    test(GROUND_TRUTH, load_and_run, get_final_value_h)
     # RUN
-    #print('PART 1 result: {}'.format(load_and_run('day23.txt', get_number_mul)))
-    print('PART 2 result: {}'.format(get_final_value_h_optimized()))
+    print('PART 1 result: {}'.format(load_and_run('day23.txt', get_number_mul)))
+    print('PART 2 result: {}'.format(load_and_run('day23.txt', get_final_value_h)))
@@ -0,0 +1,124 @@
+#/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+ Register machine of the assembly puzzles (days 18 and 23). Programs are
+ compiled once into (opcode, x, y) tuples, whose operands are indexes in a
+ list of registers: registers come first, then a slot for each number,
+ holding its value. The dispatch loop of each instruction set is generated
+ from the statements of its commands.
+"""
+
+import linecache
+import textwrap
+
+REGISTERS = 'abcdefghijklmnopqrstuvwxyz'
+
+class InstructionSet(object):
+    """ Commands of a register machine, each given as the Python statements
+    executing it. Unknown commands do nothing
+
+    The statements of each command are pasted, as a branch on its opcode,
+    in the loop of a generated run function (see get_runner). They run with
+    these local names, and must not assign any other:
+     * reg: the list of registers, whose values are read and written
+     * x, y: the indexes in reg of the operands of the instruction (numbers
+       have slots of their own, so reg[y] is the value of a number or
+       register alike)
+     * self: the machine, for any other state (outboxes, sounds...)
+     * counter: the index of the instruction. A jump is
+       'counter += offset' then 'continue', without the continue the next
+       instruction would also be skipped
+    A 'break' stops the machine, whose counter stays at the instruction, so
+    that running it again executes it again. Otherwise the next instruction
+    follows. In tracebacks, the generated source is named after the commands
+    of the set, and its lines are shown by the traceback module """
+    def __init__(self, **commands):
+        self.commands = list(commands)
+        self.statements = list(commands.values())
+        self.opcodes = { command: opcode for opcode, command in enumerate(self.commands) }
+        # run functions, with and without counting the executions
+        self.runners = {}
+
+    def compile(self, instructions, registers=REGISTERS):
+        """ Compile instructions into (opcode, x, y) tuples, and the list of
+        registers they run on """
+        reg = [0] * len(registers)
+        index = { name: i for i, name in enumerate(registers) }
+        def operand(x):
+            if x in index:
+                return index[x]
+            reg.append(int(x))
+            return len(reg) - 1
+        nop = len(self.commands)
+        program = []
+        for instruction in instructions:
+            command, *args = instruction.split() or ['']
+            # one-operand instructions get a second unused one
+            x, y, *_ = [operand(arg) for arg in args] + [0, 0]
+            program.append((self.opcodes.get(command, nop), x, y))
+        return program, reg
+
+    def get_runner(self, count=False):
+        """ Get the function running a program from a counter, until its end
+        or a break. Opcodes are compared to constants, faster than names """
+        if count not in self.runners:
+            lines = [
+                    'def run(self, reg, program, counter, counts):',
+                    '    length = len(program)',
+                    '    while counter < length:',
+                    '        opcode, x, y = program[counter]',
+            ]
+            if count:
+                lines.append('        counts[opcode] += 1')
+            for opcode, statement in enumerate(self.statements):
+                lines.append('        {} opcode == {}:'.format(
+                    'elif' if opcode else 'if', opcode))
+                lines.append(textwrap.indent(statement.strip(), ' ' * 12))
+            lines += [
+                    '        counter += 1',
+                    '    return counter',
+            ]
+            source = '\n'.join(lines) + '\n'
+            filename = '<InstructionSet {}{}>'.format(
+                    ' '.join(self.commands), ' counting' if count else '')
+            # kept for tracebacks, which read the lines of their files
+            linecache.cache[filename] = (
+                    len(source), None, source.splitlines(True), filename)
+            namespace = {}
+            exec(compile(source, filename, 'exec'), namespace)
+            self.runners[count] = namespace['run']
+        return self.runners[count]
+
+
+class Machine(object):
+    """ Register machine running a program of an instruction set. With
+    count, the executions of each command are counted (a break counts the
+    instruction it stops at) """
+    def __init__(self, isa, instructions, registers=REGISTERS, count=False):
+        self.isa = isa
+        self.registers = registers
+        self.program, self.reg = isa.compile(instructions, registers)
+        self.counter = 0
+        self.count = count
+        # one more for the unknown commands
+        self.counts = [0] * (len(isa.commands) + 1)
+
+    def __getitem__(self, register):
+        return self.reg[self.registers.index(register)]
+
+    def __setitem__(self, register, value):
+        self.reg[self.registers.index(register)] = value
+
+    @property
+    def terminated(self):
+        return self.counter >= len(self.program)
+
+    def get_counts(self):
+        """ Get the number of executions of each command """
+        return dict(zip(self.isa.commands, self.counts))
+
+    def run(self):
+        """ Run until the end of the program, or a command stops it """
+        self.counter = self.isa.get_runner(self.count)(
+                self, self.reg, self.program, self.counter, self.counts)
@@ -0,0 +1,195 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""Benchmarks for puzzle solvers on synthetic inputs"""
+
+import os
+import sys
+import time
+import argparse
+import statistics
+import subprocess
+
+from day1 import Puzzle1
+from day4 import Puzzle4
+from day5 import Puzzle5
+from solvers import PUZZLES
+from generators import (synthetic_input, generate_frequency_changes,
+        generate_guard_log, generate_polymer)
+
+def timed(func, *args, **kwargs):
+    """ Return the result of a call and its wall time in seconds """
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+def benchmark_frequency(sizes, spread, with_set):
+    """ Compare the set and drift methods of Puzzle1 part two """
+    print("{:>10} {:>10} {:>10} {:>10}".format('changes', 'result', 'drift', 'set'))
+    for size in sizes:
+        with synthetic_input(generate_frequency_changes(size, spread)) as path:
+            puzzle = Puzzle1(path)
+            puzzle.parse_input()
+        result, drift = timed(puzzle.part_two)
+        if with_set:
+            set_result, set = timed(puzzle.get_first_reached_twice_by_set)
+            assert result == set_result
+            set = "{:.3f}s".format(set)
+        else:
+            set = '-'
+        print("{:>10} {:>10} {:>9.3f}s {:>10}".format(size, result, drift, set))
+
+def benchmark_guards(years, guards):
+    """ Time Puzzle4 on logs spanning several years of shifts """
+    print("{:>6} {:>10} {:>10} {:>10} {:>10}".format(
+        'years', 'records', 'parse', 'part one', 'part two'))
+    for n_years in years:
+        with synthetic_input(generate_guard_log(365 * n_years, guards)) as path:
+            puzzle = Puzzle4(path)
+            _, parse = timed(puzzle.parse_input)
+        _, part_one = timed(puzzle.part_one)
+        _, part_two = timed(puzzle.part_two)
+        print("{:>6} {:>10} {:>9.3f}s {:>9.3f}s {:>9.3f}s".format(
+            n_years, len(puzzle.timestamps), parse, part_one, part_two))
+
+def benchmark_polymer(sizes, workers):
+    """ Compare serial and parallel runs of Puzzle5 part two """
+    print("{:>10} {:>10} {:>10} {:>10} {:>8}".format(
+        'units', 'reduced', 'serial', 'parallel', 'speedup'))
+    for size in sizes:
+        with synthetic_input(generate_polymer(size)) as path:
+            puzzle = Puzzle5(path, workers=1)
+            puzzle.parse_input()
+        serial_result, serial = timed(puzzle.part_two)
+        puzzle.workers = workers
+        parallel_result, parallel = timed(puzzle.part_two)
+        assert serial_result == parallel_result
+        print("{:>10} {:>10} {:>9.3f}s {:>9.3f}s {:>7.2f}x".format(
+            size, len(puzzle.reduced_polymer), serial, parallel, serial / parallel))
+
+def get_import_time(puzzle_number):
+    """ Get the time, in ms, spent importing modules (as measured by
+    python -X importtime) to build the CLI of one puzzle """
+    command = [
+            sys.executable, '-X', 'importtime',
+            'solvers.py', str(puzzle_number), '--help']
+    stderr = subprocess.run(
+            command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+            text=True, check=True).stderr
+    # lines are 'import time: self | cumulative | name', nested imports
+    # have their name indented
+    return sum(
+            int(cumulative) for _, cumulative, name in
+            (line.split('|') for line in stderr.splitlines()[1:])
+            if not name[1:].startswith(' ')) / 1000
+
+def get_imported_puzzles(puzzle_number):
+    """ Get the puzzle modules imported to build the CLI of one puzzle """
+    code = (
+            "import sys, solvers\n"
+            "solvers.get_parser([{!r}, 'input'])\n"
+            "print(*sorted(set(solvers.PUZZLES.values()) & set(sys.modules)))"
+    ).format(str(puzzle_number))
+    return subprocess.run(
+            [sys.executable, '-c', code], stdout=subprocess.PIPE,
+            text=True, check=True).stdout.split()
+
+# Median import time of the CLI of any puzzle before the optimizations, in
+# ms, measured as get_import_time does. The margin absorbs the noise of
+# measures, not the cost of new imports
+STARTUP_BASELINE_MS = 38
+STARTUP_MARGIN_MS = 7
+
+def benchmark_startup(puzzle_numbers, repeat, max_ms):
+    """ Check the startup of the CLI of each puzzle: only its own module must
+    be imported, and the median import time must stay below max_ms """
+    failed = False
+    print("{:>6} {:>10} {:>10}  {}".format('puzzle', 'median', 'max', 'imported'))
+    for puzzle_number in puzzle_numbers:
+        times = [get_import_time(puzzle_number) for _ in range(repeat)]
+        imported = get_imported_puzzles(puzzle_number)
+        median = statistics.median(times)
+        ok = median <= max_ms and imported == [PUZZLES[puzzle_number]]
+        failed |= not ok
+        print("{:>6} {:>8.1f}ms {:>8.1f}ms  {} ... {}".format(
+            puzzle_number, median, max(times), ' '.join(imported),
+            'PASS' if ok else 'FAIL'))
+    return 1 if failed else 0
+
+
+def get_parser():
+    """ Construct a parser with one subparser per benchmark """
+    parser = argparse.ArgumentParser(
+            description=__doc__,
+            formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+
+    subparsers = parser.add_subparsers(
+            title='Benchmarks',
+            dest='benchmark',
+            metavar='benchmark',
+    )
+    subparsers.required = True
+
+    frequency = subparsers.add_parser(
+            'frequency',
+            help="Set vs drift methods of Puzzle1 part two",
+            formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    frequency.add_argument(
+            '--sizes', type=int, nargs='+',
+            default=[10**3, 10**4, 10**5, 10**6],
+            help="Number of frequency changes")
+    frequency.add_argument(
+            '--spread', type=int, default=1000,
+            help="Maximum absolute value of the changes")
+    frequency.add_argument(
+            '--with-set', action='store_true',
+            help="Also time the set method (slow on these inputs)")
+    frequency.set_defaults(
+            func=lambda args: benchmark_frequency(args.sizes, args.spread, args.with_set))
+
+    guards = subparsers.add_parser(
+            'guards',
+            help="Puzzle4 on logs with years of shifts",
+            formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    guards.add_argument(
+            '--years', type=int, nargs='+', default=[1, 10, 100],
+            help="Number of years of shifts in the logs")
+    guards.add_argument(
+            '--guards', type=int, default=100,
+            help="Number of different guards")
+    guards.set_defaults(func=lambda args: benchmark_guards(args.years, args.guards))
+
+    polymer = subparsers.add_parser(
+            'polymer',
+            help="Serial vs parallel Puzzle5 part two",
+            formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    polymer.add_argument(
+            '--sizes', type=int, nargs='+',
+            default=[10**5, 10**6, 10**7],
+            help="Number of units of the synthetic polymers")
+    polymer.add_argument(
+            '--workers', type=int, default=os.cpu_count(),
+            help="Number of processes of the parallel run")
+    polymer.set_defaults(func=lambda args: benchmark_polymer(args.sizes, args.workers))
+
+    startup = subparsers.add_parser(
+            'startup',
+            help="Import time of the solvers CLI, as a regression guard",
+            formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    startup.add_argument(
+            '--puzzles', type=int, nargs='+', default=sorted(PUZZLES),
+            help="Puzzles whose CLI is started")
+    startup.add_argument(
+            '--repeat', type=int, default=5,
+            help="Number of measures per puzzle")
+    startup.add_argument(
+            '--max-ms', type=float, default=STARTUP_BASELINE_MS + STARTUP_MARGIN_MS,
+            help="Maximum median import time, in ms")
+    startup.set_defaults(
+            func=lambda args: benchmark_startup(args.puzzles, args.repeat, args.max_ms))
+
+    return parser
+
+if __name__ == '__main__':
+    args = get_parser().parse_args()
+    sys.exit(args.func(args))
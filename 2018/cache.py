@@ -0,0 +1,174 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""On-disk caches for the puzzle solvers
+"""
+
+import os
+import time
+import pickle
+import tempfile
+from collections import OrderedDict, Counter
+
+class DiskCache(object):
+    """ Entries stored as files of a directory, named by their key
+
+    Reading an entry marks it as used, and the least recently used entries
+    are removed when the entries take more than max_size bytes. Hits, misses
+    and evictions are counted in stats """
+    def __init__(self, directory, max_size=1 << 30):
+        self.directory = directory
+        self.max_size = max_size
+        self.stats = Counter(hits=0, misses=0, evictions=0)
+        os.makedirs(directory, exist_ok=True)
+
+    def get_path(self, key):
+        """ Get the path of the file of an entry """
+        return os.path.join(self.directory, key)
+
+    def get(self, key):
+        """ Get the data of an entry, None if there is none """
+        path = self.get_path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            self.stats['misses'] += 1
+            return None
+        self.stats['hits'] += 1
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            # evicted by another process since it was read
+            pass
+        return data
+
+    def put(self, key, data):
+        """ Store the data of an entry """
+        # written to a temporary file first, so entries are never partial
+        fd, path = tempfile.mkstemp(dir=self.directory, prefix='.')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(path, self.get_path(key))
+        self.evict()
+
+    def remove(self, key):
+        """ Remove an entry """
+        try:
+            os.remove(self.get_path(key))
+        except FileNotFoundError:
+            pass
+
+    def evict(self):
+        """ Remove the least recently used entries above the size cap
+
+        Processes sharing the directory evict entries too, entries removed
+        while this runs are skipped """
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.startswith('.') or not entry.is_file():
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+        entries.sort()
+        size = sum(entry_size for _, entry_size, _ in entries)
+        for _, entry_size, path in entries:
+            if size <= self.max_size:
+                break
+            size -= entry_size
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            self.stats['evictions'] += 1
+
+
+class ParseCache(DiskCache):
+    """ Parsed inputs of puzzles, keyed by the hash of their inputs and the
+    parsing version of the puzzle
+
+    The PARSED attributes of a puzzle are stored pickled, so that repeated
+    runs on the same input skip parse_input """
+    def parse(self, puzzle):
+        """ Set the parsed attributes of the puzzle, from the cache if they
+        are there, else from parse_input """
+        key = puzzle.get_parse_key()
+        data = self.get(key)
+        if data is not None:
+            vars(puzzle).update(pickle.loads(data))
+            return
+        puzzle.parse_input()
+        parsed = {
+                name: getattr(puzzle, name) for name in puzzle.PARSED
+                if name in vars(puzzle)
+        }
+        self.put(key, pickle.dumps(parsed, pickle.HIGHEST_PROTOCOL))
+
+
+class ResultCache(object):
+    """ Results of puzzles, kept in memory and optionally on disk
+
+    The memory tier keeps the max_entries most recently used results, the
+    disk tier is a DiskCache. Results older than ttl seconds are dropped
+    from both. Hits and misses of each tier are counted in stats """
+    def __init__(self, directory=None, max_entries=1024, max_size=1 << 30,
+            ttl=None):
+        self.memory = OrderedDict()
+        self.max_entries = max_entries
+        self.disk = DiskCache(directory, max_size) if directory else None
+        self.ttl = ttl
+        self.stats = Counter(memory_hits=0, disk_hits=0, misses=0, expired=0)
+
+    def is_expired(self, created):
+        """ Check if a result created at that time is too old """
+        return self.ttl is not None and time.time() - created > self.ttl
+
+    def lookup(self, key):
+        """ Get a result, raise KeyError if it is not cached """
+        if key in self.memory:
+            created, result = self.memory[key]
+            if not self.is_expired(created):
+                self.memory.move_to_end(key)
+                self.stats['memory_hits'] += 1
+                return result
+            self.stats['expired'] += 1
+            del self.memory[key]
+        data = self.disk.get(key) if self.disk else None
+        if data is not None:
+            created, result = pickle.loads(data)
+            if not self.is_expired(created):
+                self.stats['disk_hits'] += 1
+                self.put_memory(key, created, result)
+                return result
+            self.stats['expired'] += 1
+            self.disk.remove(key)
+        self.stats['misses'] += 1
+        raise KeyError(key)
+
+    def store(self, key, result):
+        """ Cache a result in both tiers """
+        created = time.time()
+        self.put_memory(key, created, result)
+        if self.disk:
+            self.disk.put(key, pickle.dumps((created, result), pickle.HIGHEST_PROTOCOL))
+
+    def put_memory(self, key, created, result):
+        """ Keep a result in memory, dropping the least recently used ones """
+        self.memory[key] = (created, result)
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_entries:
+            self.memory.popitem(last=False)
+
+
+# Result caches by directory and ttl, so that puzzles share their memory tier
+RESULT_CACHES = {}
+
+def get_result_cache(directory=None, ttl=None):
+    """ Get the result cache of a directory (None for memory only) with a
+    ttl """
+    if (directory, ttl) not in RESULT_CACHES:
+        RESULT_CACHES[directory, ttl] = ResultCache(directory, ttl=ttl)
+    return RESULT_CACHES[directory, ttl]
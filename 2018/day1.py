@@ -0,0 +1,73 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""Day 1: Chronal Calibration
+"""
+
+from array import array
+from itertools import accumulate
+from collections import defaultdict
+
+from puzzle import Puzzle, map_file_or_string
+
+
+class Puzzle1(Puzzle):
+    DAY = 1
+
+    PARSED = ('changes',)
+
+    def parse_input(self):
+        # one machine integer per change, parsed line by line from the mapping
+        with map_file_or_string(self.input) as f:
+            self.changes = array('q', map(int, f.lines()))
+
+    def part_one(self):
+        """ First part of the puzzle: return the sum of all numbers in file """
+        total = sum(self.changes)
+        return total
+
+    def part_two(self):
+        """ Get the first number reached twice """
+        drift = sum(self.changes)
+        if drift == 0:
+            return self.get_first_reached_twice_by_set()
+        return self.get_first_reached_twice_by_drift(drift)
+
+    def get_first_reached_twice_by_set(self):
+        """ Apply the changes until a total is reached twice """
+        total = 0
+        reached = {0}
+        twice_found = False
+        while not twice_found:
+            for change in self.changes:
+                total += change
+                if total in reached:
+                    twice_found = True
+                    break
+                reached.add(total)
+        return total
+
+    def get_first_reached_twice_by_drift(self, drift):
+        """ Find the first total reached twice from the totals of the first
+        pass and the drift of each pass over the changes """
+        # After k passes and i more changes the total is totals[i] + k * drift
+        totals = list(accumulate(self.changes[:-1], initial=0))
+        reached = set()
+        for total in totals:
+            if total in reached:
+                return total
+            reached.add(total)
+        # A total is reached again only by totals with the same residue
+        # modulo the drift: the next one in the drift direction reaches it
+        # after (difference / drift) passes
+        residues = defaultdict(list)
+        for i, total in enumerate(totals):
+            residues[total % drift].append((total, i))
+        first = None
+        for group in residues.values():
+            group.sort(reverse=drift < 0)
+            for (total, i), (next_total, _) in zip(group, group[1:]):
+                step = (next_total - total) // drift * len(totals) + i
+                if first is None or step < first[0]:
+                    first = (step, next_total)
+        return first[1] if first else None
@@ -0,0 +1,151 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""Day 2: Inventory Management System
+"""
+
+from functools import cached_property
+from collections import defaultdict
+
+from puzzle import Puzzle, open_file_or_string, map_file_or_string
+
+
+class Puzzle2(Puzzle):
+    DAY = 2
+
+    PARSED = ('words', 'matrix', 'width')
+    PARSE_OPTIONS = ('batch',)
+
+    PADDING = ord(' ')
+    NEWLINE = ord('\n')
+    # Prime modulus of the hashes of near_duplicates
+    MODULUS = (1 << 61) - 1
+
+    def __init__(self, input=None, batch=False, *args, **kwargs):
+        super().__init__(input, *args, **kwargs)
+        self.batch = batch
+
+    @classmethod
+    def add_subparser(cls, subparsers):
+        parser = super().add_subparser(subparsers)
+        parser.add_argument(
+                '--batch', action='store_true',
+                help="Count letters over a matrix of all the ids at once"
+        )
+        return parser
+
+    def parse_input(self):
+        if self.batch:
+            with map_file_or_string(self.input) as f:
+                self.matrix, self.width = self.get_matrix(f.read())
+            # the words are only split from the matrix if part two needs them
+            vars(self).pop('words', None)
+            return
+        with open_file_or_string(self.input) as f:
+            self.words = list(map(str.strip, f.readlines()))
+
+    @cached_property
+    def words(self):
+        """ The words of the matrix, in batch mode """
+        return self.matrix.decode().split()
+
+    def get_matrix(self, data):
+        """ Get the ids as rows of a fixed width matrix, and its width
+
+        Every row ends with a newline, shorter words are padded with spaces.
+        When all the ids have the same length that is the input itself """
+        if data and not data.endswith(b'\n'):
+            data += b'\n'
+        width = data.find(b'\n') + 1
+        if (width and len(data) % width == 0
+                and data[width - 1::width] == b'\n' * (len(data) // width)):
+            return data, width
+        words = data.split()
+        width = max(map(len, words), default=0) + 1
+        return b''.join(word.ljust(width - 1) + b'\n' for word in words), width
+
+    def part_one(self):
+        """ First part of the puzzle: count the number of words that contain
+        exactly 2 and 3 of the same character, and return the product"""
+        # the counts of a row of the matrix must fit in one byte, longer ids
+        # are counted word by word
+        if self.batch and self.width <= 0xff:
+            return self.part_one_batch()
+        words_with_two = 0
+        words_with_three = 0
+        for word in self.words:
+            letters = self.get_occurrences(word)
+            words_with_two += 1 if 2 in letters.values() else 0
+            words_with_three += 1 if 3 in letters.values() else 0
+        return words_with_two * words_with_three
+
+    def get_occurrences(self, word):
+        """ Get the occurences per letter """
+        return {
+                letter: word.count(letter) for letter in set(word)
+        }
+
+    def part_one_batch(self):
+        """ First part of the puzzle, counting the letters of all the rows of
+        the matrix together """
+        exactly_two = bytes(i == 2 for i in range(256))
+        exactly_three = bytes(i == 3 for i in range(256))
+        words_with_two = 0
+        words_with_three = 0
+        for letter in set(self.matrix) - {self.PADDING, self.NEWLINE}:
+            counts = self.get_letter_counts(letter)
+            # one bit set per row, in the lowest bit of its byte
+            words_with_two |= int.from_bytes(counts.translate(exactly_two), 'little')
+            words_with_three |= int.from_bytes(counts.translate(exactly_three), 'little')
+        return bin(words_with_two).count('1') * bin(words_with_three).count('1')
+
+    def get_letter_counts(self, letter):
+        """ Get the occurrences of a letter in each row, one byte per row """
+        rows = len(self.matrix) // self.width
+        table = bytearray(256)
+        table[letter] = 1
+        is_letter = self.matrix.translate(table)
+        # Each column is read as a big integer with one byte per row, adding
+        # the columns adds the counts of all the rows at once
+        counts = sum(
+                int.from_bytes(is_letter[column::self.width], 'little')
+                for column in range(self.width))
+        return counts.to_bytes(rows, 'little')
+
+    def part_two(self):
+        """ Get the two words that only differ in one character """
+        for word, _, i in self.near_duplicates():
+            return word[0:i] + word[i+1:]
+
+    def near_duplicates(self):
+        """ Iterate over the pairs of words that only differ in one character,
+        with the position of that character """
+        # Only words of the same length can differ in one character
+        groups = defaultdict(list)
+        for word in self.words:
+            word = word.encode()
+            groups[len(word)].append(word)
+        for length, words in sorted(groups.items()):
+            yield from self.near_duplicates_of_length(words, length)
+
+    def near_duplicates_of_length(self, words, length):
+        """ near_duplicates, of words of the same length """
+        # Each word is hashed once, as its bytes in base 256 modulo a prime.
+        # Subtracting the i-th character gives the same small key for words
+        # only differing there, candidates with the same key are compared
+        hashes = [int.from_bytes(word, 'big') % self.MODULUS for word in words]
+        for i in range(length):
+            power = pow(256, length - 1 - i, self.MODULUS)
+            keys = [
+                    (hash - word[i] * power) % self.MODULUS
+                    for word, hash in zip(words, hashes)]
+            if len(set(keys)) == len(keys):
+                continue
+            buckets = defaultdict(list)
+            for word, key in zip(words, keys):
+                bucket = buckets[key]
+                for other in bucket:
+                    if (other[i] != word[i] and other[:i] == word[:i]
+                            and other[i + 1:] == word[i + 1:]):
+                        yield other.decode(), word.decode(), i
+                bucket.append(word)
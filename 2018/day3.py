@@ -0,0 +1,253 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""Day 3: No Matter How You Slice It
+"""
+
+import re
+from functools import cached_property
+from array import array
+from itertools import accumulate
+from operator import add
+
+from puzzle import Puzzle, open_file_or_string
+
+
+class FabricGrid(object):
+    """ Number of claims covering each square inch of the fabric
+
+    The claims are added to a 2D difference array (+1/-1 on the corners of
+    each claim), which is then integrated row by row. Building it is
+    O(claims + area) and it takes 4 bytes per square inch """
+    def __init__(self, requests):
+        self.requests = requests
+        self.width = max(
+                (r['x'] + r['length'] for r in requests.values()), default=0)
+        self.height = max(
+                (r['y'] + r['height'] for r in requests.values()), default=0)
+        self.grid = self.get_coverage()
+
+    def get_coverage(self):
+        """ Integrate the difference array of the claims """
+        stride = self.width + 1
+        diff = array('i', bytes(4 * stride * (self.height + 1)))
+        for r in self.requests.values():
+            top = r['y'] * stride
+            bottom = (r['y'] + r['height']) * stride
+            left, right = r['x'], r['x'] + r['length']
+            diff[top + left] += 1
+            diff[top + right] -= 1
+            diff[bottom + left] -= 1
+            diff[bottom + right] += 1
+        grid = array('i')
+        row = array('i', bytes(4 * stride))
+        for y in range(0, self.height * stride, stride):
+            row = array('i', map(add, row, accumulate(diff[y:y + stride])))
+            grid.extend(row[:self.width])
+        return grid
+
+    def overlapping_area(self):
+        """ Get the sq inches covered by more than one claim """
+        return len(self.grid) - self.grid.count(0) - self.grid.count(1)
+
+    def non_overlapping_ids(self):
+        """ Iterate over the ids of the claims that do not overlap """
+        for id, r in self.requests.items():
+            left, right = r['x'], r['x'] + r['length']
+            rows = range(r['y'], r['y'] + r['height'])
+            if all(max(self.grid[y * self.width + left:y * self.width + right],
+                    default=0) <= 1 for y in rows):
+                yield id
+
+
+class ClaimTree(object):
+    """ Segment tree over the elementary intervals between sorted bounds
+
+    Keeps how many claims cover each interval (without pushing the counts
+    down), the length covered at least once and twice, and the highest
+    stamp put on each interval """
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.size = max(len(bounds) - 1, 1)
+        self.cover = [0] * (4 * self.size)
+        self.once = [0] * (4 * self.size)
+        self.twice = [0] * (4 * self.size)
+        self.stamps = [0] * (4 * self.size) # highest stamp in the subtree
+        self.tags = [0] * (4 * self.size) # stamp of the whole subtree
+
+    @property
+    def covered_twice(self):
+        """ Total length covered by more than one claim """
+        return self.twice[1]
+
+    def add(self, lo, hi, value, node=1, left=0, right=None):
+        """ Add value to the cover count of intervals [lo, hi) """
+        right = self.size if right is None else right
+        if hi <= left or right <= lo:
+            return
+        if lo <= left and right <= hi:
+            self.cover[node] += value
+        else:
+            mid = (left + right) // 2
+            self.add(lo, hi, value, 2 * node, left, mid)
+            self.add(lo, hi, value, 2 * node + 1, mid, right)
+        self.update_lengths(node, left, right)
+
+    def update_lengths(self, node, left, right):
+        """ Update the covered lengths of a node from its children """
+        length = self.bounds[right] - self.bounds[left]
+        leaf = right - left == 1
+        once = 0 if leaf else self.once[2 * node] + self.once[2 * node + 1]
+        twice = 0 if leaf else self.twice[2 * node] + self.twice[2 * node + 1]
+        if self.cover[node] >= 2:
+            once, twice = length, length
+        elif self.cover[node] == 1:
+            once, twice = length, once
+        self.once[node], self.twice[node] = once, twice
+
+    def is_covered(self, lo, hi, node=1, left=0, right=None):
+        """ Check if any interval in [lo, hi) is covered """
+        right = self.size if right is None else right
+        if hi <= left or right <= lo:
+            return False
+        if self.cover[node]:
+            return True
+        if lo <= left and right <= hi:
+            return self.once[node] > 0
+        mid = (left + right) // 2
+        return (self.is_covered(lo, hi, 2 * node, left, mid)
+                or self.is_covered(lo, hi, 2 * node + 1, mid, right))
+
+    def stamp(self, lo, hi, value, node=1, left=0, right=None):
+        """ Raise the stamp of intervals [lo, hi) to value """
+        right = self.size if right is None else right
+        if hi <= left or right <= lo:
+            return
+        self.stamps[node] = max(self.stamps[node], value)
+        if lo <= left and right <= hi:
+            self.tags[node] = max(self.tags[node], value)
+        else:
+            mid = (left + right) // 2
+            self.stamp(lo, hi, value, 2 * node, left, mid)
+            self.stamp(lo, hi, value, 2 * node + 1, mid, right)
+
+    def latest(self, lo, hi, node=1, left=0, right=None):
+        """ Get the highest stamp of intervals [lo, hi) """
+        right = self.size if right is None else right
+        if hi <= left or right <= lo:
+            return 0
+        if lo <= left and right <= hi:
+            return self.stamps[node]
+        mid = (left + right) // 2
+        return max(self.tags[node],
+                self.latest(lo, hi, 2 * node, left, mid),
+                self.latest(lo, hi, 2 * node + 1, mid, right))
+
+
+class FabricSweep(object):
+    """ Overlaps of the claims found with a vertical sweep line
+
+    The y coordinates are compressed and the claims crossing the sweep line
+    are kept in a ClaimTree. A claim overlaps another one if, when it is
+    added, part of its span is already covered, or if another claim was
+    added over its span before it is removed. O(n log n) in the number of
+    claims, whatever the size of the fabric """
+    def __init__(self, requests):
+        self.requests = requests
+        self.area, self.overlapping_ids = self.sweep()
+
+    def sweep(self):
+        """ Get the overlapping area and the ids of overlapping claims """
+        bounds = sorted(
+                {r['y'] for r in self.requests.values()} |
+                {r['y'] + r['height'] for r in self.requests.values()})
+        index = { y: i for i, y in enumerate(bounds) }
+        events = []
+        for id, r in self.requests.items():
+            if not r['length'] or not r['height']:
+                continue
+            lo, hi = index[r['y']], index[r['y'] + r['height']]
+            # at the same x, claims are removed before others are added
+            events.append((r['x'], True, lo, hi, id))
+            events.append((r['x'] + r['length'], False, lo, hi, id))
+        events.sort()
+
+        tree = ClaimTree(bounds)
+        area = 0
+        added = {}
+        overlapping_ids = set()
+        x = events[0][0] if events else 0
+        for stamp, (next_x, is_start, lo, hi, id) in enumerate(events, 1):
+            area += tree.covered_twice * (next_x - x)
+            x = next_x
+            if is_start:
+                if tree.is_covered(lo, hi):
+                    overlapping_ids.add(id)
+                added[id] = stamp
+                tree.add(lo, hi, 1)
+                tree.stamp(lo, hi, stamp)
+            else:
+                tree.add(lo, hi, -1)
+                if tree.latest(lo, hi) > added[id]:
+                    overlapping_ids.add(id)
+        return area, overlapping_ids
+
+    def overlapping_area(self):
+        """ Get the sq inches covered by more than one claim """
+        return self.area
+
+    def non_overlapping_ids(self):
+        """ Iterate over the ids of the claims that do not overlap """
+        return (id for id in self.requests if id not in self.overlapping_ids)
+
+
+class Puzzle3(Puzzle):
+    DAY = 3
+
+    PARSED = ('requests',)
+
+    BACKENDS = {
+            'grid': FabricGrid,
+            'sweep': FabricSweep,
+    }
+
+    def __init__(self, input=None, backend='grid', *args, **kwargs):
+        super().__init__(input, *args, **kwargs)
+        self.backend = backend
+
+    @classmethod
+    def add_subparser(cls, subparsers):
+        parser = super().add_subparser(subparsers)
+        parser.add_argument(
+                '--backend', choices=list(cls.BACKENDS), default='grid',
+                help="Overlap engine: a dense grid, or a sweep line for sparse"
+                " claims with large coordinates"
+        )
+        return parser
+
+    def parse_input(self):
+        with open_file_or_string(self.input) as f:
+            self.requests = {}
+            REQUEST = re.compile(r'#(?P<id>\d+) @ (?P<x>\d+),(?P<y>\d+): (?P<length>\d+)x(?P<height>\d+)')
+            for line in f.readlines():
+                match = REQUEST.match(line)
+                try:
+                    request = { key: int(val) for key, val in match.groupdict().items() }
+                except (AttributeError, KeyError):
+                    continue
+                self.requests[request['id']] = request
+        # the fabric is built from the new requests when needed
+        vars(self).pop('fabric', None)
+
+    @cached_property
+    def fabric(self):
+        """ The overlap engine of the claims """
+        return self.BACKENDS[self.backend](self.requests)
+
+    def part_one(self):
+        """ Find the sq inches claimed by more than one party """
+        return self.fabric.overlapping_area()
+
+    def part_two(self):
+        """ Get the one claim that does not overlap """
+        return next(self.fabric.non_overlapping_ids())
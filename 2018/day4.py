@@ -0,0 +1,119 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""Day 4: Repose Record
+"""
+
+import heapq
+from array import array
+from itertools import accumulate
+
+from puzzle import Puzzle, map_file_or_string, argmax
+
+
+class Puzzle4(Puzzle):
+    DAY = 4
+
+    FALLS_ASLEEP = -1
+    WAKES_UP = -2
+    # SHIFT_STARTS = ID
+
+    PARSED = ('timestamps', 'actions', 'guards', 'sleep')
+
+    def __init__(self, input=None, merge=(), *args, **kwargs):
+        super().__init__(input, *args, **kwargs)
+        self.merge = merge
+
+    @classmethod
+    def add_subparser(cls, subparsers):
+        parser = super().add_subparser(subparsers)
+        parser.add_argument(
+                '--merge', nargs='+', default=(), metavar='input',
+                help="More logs to merge with input, all of them (input"
+                " included) must already be sorted"
+        )
+        return parser
+
+    def parse_input(self):
+        if self.merge:
+            # the logs are already sorted, merge them lazily
+            records = heapq.merge(*map(self.iter_records, self.get_inputs()))
+        else:
+            records = self.iter_records(self.input)
+        # parallel arrays of timestamps and actions
+        self.timestamps = array('q')
+        self.actions = array('q')
+        for timestamp, action in records:
+            self.timestamps.append(timestamp)
+            self.actions.append(action)
+        if not self.merge:
+            order = sorted(range(len(self.timestamps)), key=self.timestamps.__getitem__)
+            self.timestamps = array('q', map(self.timestamps.__getitem__, order))
+            self.actions = array('q', map(self.actions.__getitem__, order))
+        self.guards, self.sleep = self.get_sleep_matrix(self.timestamps, self.actions)
+
+    def get_inputs(self):
+        """ Get the inputs read by parse_input """
+        return (self.input, *self.merge)
+
+    def iter_records(self, input):
+        """ Iterate over the (timestamp, action) records of a log
+
+        Lines look like '[1518-11-01 00:00] Guard #10 begins shift', so the
+        fields are read at fixed offsets. Timestamps are encoded as
+        YYYYMMDDhhmm integers, which sort like the dates """
+        with map_file_or_string(input) as f:
+            for line in f.lines():
+                if not line.startswith(b'['):
+                    continue
+                action = line[19:20]
+                if action == b'f':
+                    action = self.FALLS_ASLEEP
+                elif action == b'w':
+                    action = self.WAKES_UP
+                elif action == b'G':
+                    action = int(line[26:line.index(b' ', 26)])
+                else:
+                    continue
+                yield int(line[1:17].translate(None, b'- :')), action
+
+    def part_one(self):
+        """ Get the ID and most probable minute a guard is asleep """
+        # get the guard that sleeps the most
+        row = argmax([
+            sum(self.sleep[start:start + 60])
+            for start in range(0, len(self.sleep), 60)])
+        # get the minute where the guard sleeps the most
+        minute = argmax(self.sleep[row * 60:(row + 1) * 60])
+        return minute * self.guards[row]
+
+    def get_sleep_matrix(self, timestamps, actions):
+        """ Get the guard IDs, and how many times each one is asleep at each
+        minute between 00.00 and 00.59, as a matrix with one row per guard """
+        # Assuming that:
+        # - logs are complete
+        # - one guard per night
+        rows = {}
+        # difference array, with one extra minute per row
+        diff = array('l')
+        for timestamp, action in zip(timestamps, actions):
+            if action == self.FALLS_ASLEEP:
+                fell_asleep_minute = timestamp % 100
+            elif action == self.WAKES_UP:
+                diff[row * 61 + fell_asleep_minute] += 1
+                diff[row * 61 + timestamp % 100] -= 1
+            else:
+                if action not in rows:
+                    rows[action] = len(rows)
+                    diff.extend(bytes(61))
+                row = rows[action]
+        sleep = array('l')
+        for start in range(0, len(diff), 61):
+            sleep.extend(accumulate(diff[start:start + 60]))
+        return list(rows), sleep
+
+    def part_two(self):
+        """ Get the ID and most probable minute a guard is asleep """
+        # get the guard and minute that were asleep together the most
+        row, minute = divmod(argmax(self.sleep), 60)
+        return minute * self.guards[row]
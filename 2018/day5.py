@@ -0,0 +1,103 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""Day 5: Alchemical Reduction
+"""
+
+from puzzle import Puzzle, map_file_or_string
+
+# Reduced polymers shorter than this are processed serially by default, a
+# process pool costs more than it saves on them
+PARALLEL_MIN_UNITS = 10**6
+
+# Reduced polymer of a worker of part two, sent once by its initializer
+worker_polymer = None
+
+def set_worker_polymer(polymer):
+    global worker_polymer
+    worker_polymer = polymer
+
+def react_worker_polymer_without(letter):
+    return Puzzle5.react_polymer_without(worker_polymer, letter)
+
+
+class Puzzle5(Puzzle):
+    DAY = 5
+
+    PARSED = ('reduced_polymer',)
+
+    def __init__(self, input=None, workers=None, *args, **kwargs):
+        super().__init__(input, *args, **kwargs)
+        self.workers = workers
+
+    @classmethod
+    def add_subparser(cls, subparsers):
+        parser = super().add_subparser(subparsers)
+        parser.add_argument(
+                '--workers', type=int, default=None,
+                help="Number of processes used in part two (default: number of "
+                     "CPUs, or one for polymers below {} units)".format(
+                         PARALLEL_MIN_UNITS)
+        )
+        return parser
+
+    def parse_input(self):
+        """ React the polymer while it is being read, only the surviving
+        units are kept in memory """
+        self.reduced_polymer = bytearray()
+        with map_file_or_string(self.input) as f:
+            for chunk in f.chunks():
+                self.react_polymer(chunk.strip(), self.reduced_polymer)
+
+    def part_one(self, polymer=None):
+        """ Get the lenght of the remaining polymer  """
+        if polymer is None:
+            return len(self.reduced_polymer)
+        return len(self.react_polymer(polymer))
+
+    @staticmethod
+    def react_polymer(polymer, stack=None):
+        """ Remove every pair of adjacent capitalized and non-capitalized letters
+
+        The polymer (bytes or str) is pushed unit by unit on top of the stack
+        of surviving units, which is returned. A non-empty stack can be given
+        to continue a reaction with the next chunk of a polymer """
+        if stack is None:
+            stack = bytearray()
+        if isinstance(polymer, str):
+            polymer = polymer.encode()
+        # ASCII letters only differ in the 0x20 bit between cases
+        for unit in polymer:
+            if stack and stack[-1] ^ unit == 0x20:
+                # remove reacting components
+                stack.pop()
+            else:
+                stack.append(unit)
+        return stack
+
+    @staticmethod
+    def react_polymer_without(polymer, letter):
+        """ Get the lenght of the reacted polymer after removing both
+        polarities of a letter """
+        return len(Puzzle5.react_polymer(
+            polymer.translate(None, bytes((letter, letter ^ 0x20)))))
+
+    def part_two(self):
+        """ Get part one, but removing each time a letter """
+        # Removing a letter before or after reacting gives the same result,
+        # so start from the already reacted polymer
+        polymer = bytes(self.reduced_polymer)
+        letters = set(polymer.lower())
+        workers = self.workers
+        if workers is None and len(polymer) < PARALLEL_MIN_UNITS:
+            workers = 1
+        if workers == 1:
+            return min((self.react_polymer_without(polymer, letter)
+                        for letter in letters), default=0)
+        # only imported here, it is slow to import for running part one
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(
+                workers, initializer=set_worker_polymer,
+                initargs=(polymer,)) as executor:
+            return min(executor.map(react_worker_polymer_without, letters),
+                       default=0)
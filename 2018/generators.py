@@ -0,0 +1,188 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""Generators of large synthetic inputs for puzzle solvers
+
+Inputs are generated as streams of text chunks from a seed, so that they
+can be written without ever being fully in memory"""
+
+import os
+import sys
+import math
+import random
+import string
+import argparse
+import tempfile
+import contextlib
+from datetime import datetime, timedelta
+
+# Letters written at once by generate_polymer
+CHUNK_SIZE = 1 << 16
+
+def join_lines(lines):
+    """ Yield the lines with a line ending after all but the last one """
+    lines = iter(lines)
+    line = next(lines, None)
+    if line is None:
+        return
+    for next_line in lines:
+        yield line + '\n'
+        line = next_line
+    yield line
+
+def get_permutation(n, rng):
+    """ Iterate over a random-looking permutation of range(n), in O(1) memory,
+    as an affine map modulo n """
+    if n < 1:
+        return
+    multiplier = rng.randrange(1, n + 1)
+    while math.gcd(multiplier, n) != 1:
+        multiplier += 1
+    offset = rng.randrange(n)
+    for i in range(n):
+        yield (multiplier * i + offset) % n
+
+def generate_frequency_changes(size, spread=1000, seed=0):
+    """ Generate frequency changes whose totals in the first pass are a
+    permutation of the multiples of spread, with a drift of one per pass, so
+    no total is reached twice before spread passes """
+    rng = random.Random(seed)
+    def get_changes():
+        total = 0
+        for i in get_permutation(size - 1, rng):
+            yield '{:+d}'.format(spread * (i + 1) - total)
+            total = spread * (i + 1)
+        yield '{:+d}'.format(1 - total)
+    return join_lines(get_changes())
+
+def generate_box_ids(size, length=26, seed=0):
+    """ Generate random box ids, two of them only differing in one letter """
+    rng = random.Random(seed)
+    size = max(size, 2)
+    # the copy of the original id, with one letter changed, comes after it
+    original = rng.randrange(size - 1)
+    copy = rng.randrange(original + 1, size)
+    def get_ids():
+        for i in range(size):
+            if i == copy:
+                position = rng.randrange(length)
+                letter = rng.choice(
+                        string.ascii_lowercase.replace(original_id[position], ''))
+                yield original_id[:position] + letter + original_id[position + 1:]
+                continue
+            id = ''.join(rng.choices(string.ascii_lowercase, k=length))
+            if i == original:
+                original_id = id
+            yield id
+    return join_lines(get_ids())
+
+def generate_claims(size, fabric=1000, seed=0):
+    """ Generate random claims over a square fabric, and one more claim out
+    of it so that one claim does not overlap """
+    rng = random.Random(seed)
+    def get_claims():
+        for id in range(1, size):
+            length, height = rng.randint(1, 30), rng.randint(1, 30)
+            yield "#{} @ {},{}: {}x{}".format(
+                id, rng.randrange(fabric - length), rng.randrange(fabric - height),
+                length, height)
+        yield "#{} @ {},0: 10x10".format(size, fabric)
+    return join_lines(get_claims())
+
+def generate_guard_log(days, guards=100, window=1024, seed=0):
+    """ Generate a guard log with one shift per day, shuffled within a
+    window of records """
+    rng = random.Random(seed)
+    def get_records():
+        start = datetime(1518, 1, 1)
+        for day in range(days):
+            midnight = start + timedelta(days=day)
+            shift = midnight - timedelta(minutes=rng.randint(0, 15))
+            yield "[{:%Y-%m-%d %H:%M}] Guard #{} begins shift".format(
+                shift, rng.randint(1, guards))
+            # naps start after minute 0, when a shift can start
+            minutes = sorted(rng.sample(range(1, 60), 2 * rng.randint(0, 4)))
+            for asleep, awake in zip(minutes[::2], minutes[1::2]):
+                yield "[{:%Y-%m-%d %H:%M}] falls asleep".format(
+                    midnight + timedelta(minutes=asleep))
+                yield "[{:%Y-%m-%d %H:%M}] wakes up".format(
+                    midnight + timedelta(minutes=awake))
+    def shuffle(records):
+        # records enter a buffer, a random one leaves it once it is full
+        buffer = []
+        for record in records:
+            buffer.append(record)
+            if len(buffer) == window:
+                i = rng.randrange(window)
+                buffer[i], buffer[-1] = buffer[-1], buffer[i]
+                yield buffer.pop()
+        rng.shuffle(buffer)
+        yield from buffer
+    return join_lines(shuffle(get_records()))
+
+def generate_polymer(size, seed=0):
+    """ Generate a random polymer of size units """
+    rng = random.Random(seed)
+    for start in range(0, size, CHUNK_SIZE):
+        yield ''.join(rng.choices(
+            string.ascii_letters, k=min(CHUNK_SIZE, size - start)))
+
+# Generators by puzzle, taking a number of records (units for polymers)
+GENERATORS = {
+        1: generate_frequency_changes,
+        2: generate_box_ids,
+        3: generate_claims,
+        # shifts have five records on average
+        4: lambda size, seed=0: generate_guard_log(max(size // 5, 1), seed=seed),
+        5: generate_polymer,
+}
+
+def generate(puzzle_number, size, seed=0):
+    """ Generate an input of about size records for a puzzle """
+    return GENERATORS[puzzle_number](size, seed=seed)
+
+def write_input(chunks, f):
+    """ Write a generated input to a text file """
+    for chunk in chunks:
+        f.write(chunk)
+
+@contextlib.contextmanager
+def synthetic_input(chunks):
+    """ Write a generated input to a temporary file, yield its path """
+    with tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False) as f:
+        write_input(chunks, f)
+    try:
+        yield f.name
+    finally:
+        os.remove(f.name)
+
+
+def get_parser():
+    """ Construct a parser """
+    parser = argparse.ArgumentParser(
+            description=__doc__,
+            formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+
+    parser.add_argument(
+            'puzzle_number', type=int, choices=list(GENERATORS),
+            help='Puzzle number to generate an input for', metavar='puzzle_number')
+    parser.add_argument(
+            'size', type=int,
+            help='Number of records (units for polymers) of the input')
+    parser.add_argument(
+            '--seed', type=int, default=0,
+            help='Seed of the random generator')
+    parser.add_argument(
+            '--output', metavar='FILE',
+            help='File to write the input to, instead of stdout')
+
+    return parser
+
+if __name__ == '__main__':
+    args = get_parser().parse_args()
+    chunks = generate(args.puzzle_number, args.size, args.seed)
+    if args.output:
+        with open(args.output, 'w') as f:
+            write_input(chunks, f)
+    else:
+        write_input(chunks, sys.stdout)
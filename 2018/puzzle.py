@@ -0,0 +1,296 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""Framework shared by the AdventOfCode2018 puzzle solvers
+"""
+
+import os
+import mmap
+import sys
+import time
+import contextlib
+from io import StringIO
+from pathlib import Path
+from abc import ABC, abstractmethod
+
+def is_file(string):
+    """ Check if a string is the path of a file, strings too long to be
+    paths are not """
+    try:
+        return Path(string).is_file()
+    except OSError:
+        return False
+
+@contextlib.contextmanager
+def open_file_or_string(string):
+    if is_file(string):
+        f = open(string, 'r')
+        yield f
+        f.close()
+    else:
+        yield StringIO(string)
+
+@contextlib.contextmanager
+def map_file_or_string(string):
+    """ Like open_file_or_string, but yield a MappedInput, files are
+    memory-mapped instead of read """
+    if is_file(string):
+        with open(string, 'rb') as f:
+            if not os.fstat(f.fileno()).st_size:
+                # empty files can not be mapped
+                yield MappedInput(b'')
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                yield MappedInput(m)
+    else:
+        yield MappedInput(string.encode())
+
+
+class MappedInput(object):
+    """ Bytes of an input, memory-mapped when it is a file
+
+    Nothing is read until it is accessed, so inputs bigger than the memory
+    can be parsed chunk by chunk or line by line. Views must be released
+    before the input is closed """
+    CHUNK_SIZE = 1 << 16
+
+    def __init__(self, data):
+        self.data = data
+
+    def __len__(self):
+        return len(self.data)
+
+    @property
+    def view(self):
+        """ Get a zero-copy view of the input """
+        return memoryview(self.data)
+
+    def read(self):
+        """ Get the whole input as bytes """
+        return self.data[:]
+
+    def chunks(self, size=None):
+        """ Iterate over consecutive chunks of the input """
+        size = size or self.CHUNK_SIZE
+        for start in range(0, len(self.data), size):
+            yield self.data[start:start + size]
+
+    def lines(self, size=None):
+        """ Iterate over the lines of the input, without line endings. The
+        parts of a line spanning chunks are only joined once it ends """
+        parts = []
+        for chunk in self.chunks(size):
+            lines = chunk.split(b'\n')
+            parts.append(lines[0])
+            if len(lines) == 1:
+                continue
+            lines[0] = b''.join(parts)
+            parts = [lines.pop()]
+            yield from lines
+        rest = b''.join(parts)
+        if rest:
+            yield rest
+
+
+class Puzzle(ABC):
+    YEAR = 2018
+
+    # Attributes set by parse_input, kept by the parse cache. The version
+    # must be bumped when what parse_input sets changes
+    PARSED = ()
+    PARSE_VERSION = 1
+    # Options changing what parse_input sets
+    PARSE_OPTIONS = ()
+
+    def __init__(self, input=None, parse_cache=None, parse_cache_size=1024,
+            result_cache=None, result_cache_ttl=None, profile=False,
+            profile_dump=None, *args, **kwargs):
+        self.input = input
+        # the caches are only imported when used, for a faster startup
+        if isinstance(parse_cache, str):
+            from cache import ParseCache
+            parse_cache = ParseCache(parse_cache, parse_cache_size << 20)
+        self.parse_cache = parse_cache
+        if isinstance(result_cache, str):
+            from cache import get_result_cache
+            result_cache = get_result_cache(result_cache, result_cache_ttl)
+        self.result_cache = result_cache
+        # with profile_dump, cProfile stats of each phase are dumped there
+        self.profile = profile or profile_dump is not None
+        self.profile_dump = profile_dump
+        self.report = None
+
+    def run(self, part_one=True, part_two=True, *args, **kwargs):
+        parts = [
+                part for part, wanted in
+                (('part_one', part_one), ('part_two', part_two)) if wanted
+        ]
+        results = {}
+        self.report = dict(year=self.YEAR, day=self.DAY, results={}, phases={})
+        if self.result_cache is not None:
+            keys = self.get_result_keys(parts)
+            for part in parts:
+                try:
+                    results[part] = self.result_cache.lookup(keys[part])
+                except KeyError:
+                    pass
+        if len(results) < len(parts):
+            with self.measure('parse_input'):
+                if self.parse_cache is None:
+                    self.parse_input()
+                else:
+                    self.parse_cache.parse(self)
+            phases = ['parse_input']
+            for part in parts:
+                if part not in results:
+                    with self.measure(part):
+                        results[part] = getattr(self, part)()
+                    if self.result_cache is not None:
+                        self.result_cache.store(keys[part], results[part])
+                    phases.append(part)
+            if self.profile:
+                self.trace_phases(phases)
+        self.report['results'] = results
+        return (results.get('part_one'), results.get('part_two'))
+
+    @contextlib.contextmanager
+    def measure(self, phase):
+        """ When profiling, add the wall and CPU times of a phase of the run
+        to the report """
+        if not self.profile:
+            yield
+            return
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+            self.report['phases'][phase] = dict(wall_time=wall, cpu_time=cpu)
+
+    def trace_phases(self, phases):
+        """ Run the phases again, to add the peak of memory allocated by each
+        one to the report and, with profile_dump, dump their cProfile stats.
+        Tracing slows the phases down, so they are not timed in this run.
+        The input is parsed by parse_input, even with a parse cache """
+        # only imported here, they are slow to import for running a puzzle
+        import cProfile
+        import tracemalloc
+        tracing = tracemalloc.is_tracing()
+        if not tracing:
+            tracemalloc.start()
+        try:
+            for phase in phases:
+                profiler = cProfile.Profile() if self.profile_dump else None
+                # a trace already running is kept, the peak is counted from
+                # the memory allocated before the phase
+                tracemalloc.reset_peak()
+                start, _ = tracemalloc.get_traced_memory()
+                if profiler:
+                    profiler.enable()
+                try:
+                    getattr(self, phase)()
+                finally:
+                    if profiler:
+                        profiler.disable()
+                _, peak_memory = tracemalloc.get_traced_memory()
+                self.report['phases'][phase]['peak_memory'] = peak_memory - start
+                if profiler:
+                    os.makedirs(self.profile_dump, exist_ok=True)
+                    profiler.dump_stats(os.path.join(
+                        self.profile_dump,
+                        '{}_day{}_{}.prof'.format(self.YEAR, self.DAY, phase)))
+        finally:
+            if not tracing:
+                tracemalloc.stop()
+
+    @abstractmethod
+    def parse_input(self):
+        ...
+
+    def get_inputs(self):
+        """ Get the inputs read by parse_input """
+        return (self.input,)
+
+    def get_parse_key(self):
+        """ Get a hash of the contents of the inputs, the puzzle and its
+        parsing version and options """
+        import hashlib
+        digest = hashlib.sha256(repr((
+            type(self).__module__, type(self).__qualname__, self.PARSE_VERSION,
+            [getattr(self, option) for option in self.PARSE_OPTIONS],
+        )).encode())
+        for input in self.get_inputs():
+            with map_file_or_string(input) as f:
+                digest.update(len(f).to_bytes(8, 'little'))
+                for chunk in f.chunks():
+                    digest.update(chunk)
+        return digest.hexdigest()
+
+    @classmethod
+    def get_solver_digest(cls):
+        """ Get a hash of the sources of the module of the puzzle and of this
+        module, whose parsing helpers the puzzles share """
+        import inspect
+        import hashlib
+        digest = hashlib.sha256()
+        for module in sorted({__name__, cls.__module__}):
+            digest.update(inspect.getsource(sys.modules[module]).encode())
+        return digest.hexdigest()
+
+    def get_result_keys(self, parts):
+        """ Get the keys of the results of parts, from the parse key, the
+        part and the source of the solver """
+        import hashlib
+        parse_key = self.get_parse_key()
+        solver_digest = self.get_solver_digest()
+        return {
+                part: hashlib.sha256(
+                    repr((parse_key, self.DAY, part, solver_digest)).encode()
+                ).hexdigest()
+                for part in parts
+        }
+
+    @classmethod
+    def add_subparser(cls, subparsers):
+        parser = subparsers.add_parser(
+                str(cls.DAY),
+                help="Execute day {} puzzle".format(cls.DAY))
+        parser.add_argument(
+                'input', type=str,
+                help="Input string or path to file containing input"
+        )
+        parser.add_argument(
+                '--parse-cache', metavar='DIRECTORY',
+                help="Cache the parsed input in this directory"
+        )
+        parser.add_argument(
+                '--parse-cache-size', type=int, default=1024, metavar='MB',
+                help="Size above which least recently used parsed inputs are removed"
+        )
+        parser.add_argument(
+                '--result-cache', metavar='DIRECTORY',
+                help="Cache the results in this directory"
+        )
+        parser.add_argument(
+                '--result-cache-ttl', type=float, metavar='SECONDS',
+                help="Time after which cached results are recomputed"
+        )
+        parser.add_argument(
+                '--profile', action='store_true',
+                help="Print a JSON report with the time and memory of each phase"
+        )
+        parser.add_argument(
+                '--profile-dump', metavar='DIRECTORY',
+                help="Profile each phase, and dump its cProfile stats in this directory"
+        )
+        return parser
+
+    @property
+    @abstractmethod
+    def DAY(self):
+        raise NotImplementedError
+
+
+def argmax(values):
+    """ Get the index of the first largest value """
+    return max(range(len(values)), key=values.__getitem__)
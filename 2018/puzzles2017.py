@@ -0,0 +1,269 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""Solutions to the AdventOfCode2017, adapted to the Puzzle framework
+
+Each day of 2017 is registered as a Puzzle class, whose parse_input reads
+its input into what the functions of the day module take, and whose parts
+call them. The day modules are only imported, and the inputs only read,
+when a puzzle is run
+"""
+
+import os
+import re
+import sys
+import copy
+import hashlib
+import itertools
+import contextlib
+import importlib.util
+from collections import defaultdict
+
+from puzzle import Puzzle, open_file_or_string
+
+# Directory of the 2017 day modules and their inputs
+DIRECTORY = os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), os.pardir, '2017')
+
+# Puzzle class of each day, filled by register
+PUZZLES = {}
+
+# Files of the 2017 modules imported by each day module (day14 imports
+# day10, days 18 and 23 import machine), filled by import_day
+DEPENDENCIES = {}
+
+def is_day_module(name):
+    return re.fullmatch(r'day[0-9]+', name) is not None
+
+def is_2017_module(module):
+    """ Check if a module is loaded from the 2017 directory """
+    path = getattr(module, '__file__', None)
+    return path is not None and (
+            os.path.dirname(os.path.abspath(path)) == os.path.abspath(DIRECTORY))
+
+@contextlib.contextmanager
+def plain_day_imports():
+    """ Resolve the plain imports of days by 2017 days (day14 imports day10)
+    to the 2017 modules, even if 2018 modules have the same name
+
+    Modules of the 2017 directory imported before are hidden too, so that
+    the yielded list gets the files of all the ones imported in the block """
+    hidden = {
+            name: sys.modules.pop(name)
+            for name, module in list(sys.modules.items())
+            if is_day_module(name) or is_2017_module(module)
+    }
+    files = []
+    sys.path.insert(0, DIRECTORY)
+    try:
+        yield files
+    finally:
+        sys.path.remove(DIRECTORY)
+        for name, module in list(sys.modules.items()):
+            if is_2017_module(module):
+                files.append(module.__file__)
+            if is_day_module(name) or is_2017_module(module):
+                del sys.modules[name]
+        sys.modules.update(hidden)
+
+def import_day(day):
+    """ Import the module of a 2017 day, as year2017_dayN so that it does not
+    clash with the module of the same day of 2018 """
+    name = 'year2017_day{}'.format(day)
+    if name not in sys.modules:
+        spec = importlib.util.spec_from_file_location(
+                name, os.path.join(DIRECTORY, 'day{}.py'.format(day)))
+        module = importlib.util.module_from_spec(spec)
+        with plain_day_imports() as files:
+            spec.loader.exec_module(module)
+        sys.modules[name] = module
+        DEPENDENCIES[day] = sorted(files)
+    return sys.modules[name]
+
+
+class Puzzle2017(Puzzle):
+    """ A day of 2017, whose input text is parsed by PARSE and whose parts
+    are PART_ONE and PART_TWO, functions of the day module and the parsed
+    input. Without input, the day file of the 2017 directory is read, or
+    the INPUT of the day module rendered by DEFAULT_INPUT """
+    YEAR = 2017
+
+    PARSED = ('parsed',)
+    DEFAULT_INPUT = None
+    PART_TWO = None
+
+    def __init__(self, input=None, *args, **kwargs):
+        super().__init__(input, *args, **kwargs)
+        if self.input is None:
+            self.input = self.get_default_input()
+
+    @property
+    def module(self):
+        return import_day(self.DAY)
+
+    def get_default_input(self):
+        """ Get the input of the day in the 2017 directory """
+        if self.DEFAULT_INPUT is None:
+            return os.path.join(DIRECTORY, 'day{}.txt'.format(self.DAY))
+        return self.DEFAULT_INPUT(self.module)
+
+    def parse_input(self):
+        with open_file_or_string(self.input) as f:
+            self.parsed = self.PARSE(self.module, f.read())
+
+    def part_one(self):
+        return self.PART_ONE(self.module, self.parsed)
+
+    def part_two(self):
+        if self.PART_TWO is None:
+            # the last day only has one part
+            return None
+        return self.PART_TWO(self.module, self.parsed)
+
+    @classmethod
+    def get_solver_digest(cls):
+        """ Get a hash of the sources of the adapter, the day module and the
+        2017 modules it imports """
+        module = import_day(cls.DAY)
+        digest = hashlib.sha256(super().get_solver_digest().encode())
+        for path in [module.__file__, *DEPENDENCIES[cls.DAY]]:
+            with open(path, 'rb') as f:
+                digest.update(f.read())
+        return digest.hexdigest()
+
+
+def register(day, parse, part_one, part_two=None, default_input=None):
+    """ Register the Puzzle class of a 2017 day """
+    PUZZLES[day] = type('Puzzle{}'.format(day), (Puzzle2017,), dict(
+        DAY=day,
+        PARSE=staticmethod(parse),
+        PART_ONE=staticmethod(part_one),
+        PART_TWO=staticmethod(part_two) if part_two else None,
+        DEFAULT_INPUT=staticmethod(default_input) if default_input else None,
+    ))
+
+def read_text(module, text):
+    """ Read the input as the load_and_run of most days """
+    return text.rstrip()
+
+def read_lines(module, text):
+    return text.splitlines()
+
+def read_int(module, text):
+    return int(text)
+
+def read_ints(module, text):
+    return tuple(map(int, re.findall(r'-?[0-9]+', text)))
+
+def render_input(module):
+    """ Render the INPUT of a day module as an input text """
+    if isinstance(module.INPUT, tuple):
+        return ' '.join(map(str, module.INPUT))
+    return str(module.INPUT)
+
+def read_tower(module, text):
+    """ Read the tower of day 7, as its load_and_run """
+    tower = defaultdict(dict)
+    for name, weight, rest in re.findall(module.REGEX, text):
+        children = re.findall(module.REGEX_CHILDREN, rest)
+        tower[name].update(weight=int(weight), children=children)
+        for child in children:
+            tower[child].update(parent=name)
+    return tower
+
+def get_first_sum_above(module, value):
+    """ Get the first sum of adjacent positions of day 3 above the value """
+    module.calculated_sums[1] = 1
+    return next(
+            total for total in map(module.adjacent_sum, itertools.count(1))
+            if total > value)
+
+def count_valid(module, passphrases, check_function):
+    """ Count the valid passphrases of day 4, as its check_passphrases """
+    return sum(1 for passphrase in passphrases if check_function(passphrase))
+
+register(1, read_text,
+        lambda day, digits: day.get_sum_of_next_equal(digits),
+        lambda day, digits: day.get_sum_of_halfway_around_equal(digits),
+        default_input=render_input)
+register(2, read_text,
+        lambda day, text: day.get_checksum(day.iterate_input(text), day.get_row_diff),
+        lambda day, text: day.get_checksum(day.iterate_input(text), day.get_row_division),
+        default_input=render_input)
+register(3, read_int,
+        lambda day, position: day.manhattan_distance(position),
+        get_first_sum_above,
+        default_input=render_input)
+register(4, lambda day, text: text.split('\n'),
+        lambda day, passphrases: count_valid(day, passphrases, day.check_duplicate),
+        lambda day, passphrases: count_valid(day, passphrases, day.check_anagram))
+register(5, lambda day, text: list(map(int, text.rstrip().split('\n'))),
+        lambda day, jumps: day.get_exit_step(day.Program(list(jumps)), day.add_one),
+        lambda day, jumps: day.get_exit_step(day.Program(list(jumps)), day.add_sub_one))
+register(6, lambda day, text: list(map(int, text.split())),
+        lambda day, memory: day.count_until_repeated(list(memory)),
+        lambda day, memory: day.count_distance(list(memory)),
+        default_input=render_input)
+register(7, read_tower,
+        lambda day, tower: day.get_root(tower),
+        # the weights of the tower are updated
+        lambda day, tower: day.get_needed_weight(copy.deepcopy(tower)))
+register(8, lambda day, text: re.findall(day.REGEX, text),
+        lambda day, program: day.get_biggest(program),
+        lambda day, program: day.get_biggest_ever(program))
+register(9, lambda day, text: text,
+        lambda day, stream: day.get_total_score_and_garbage(stream)[0],
+        lambda day, stream: day.get_total_score_and_garbage(stream)[1])
+register(10, read_text,
+        lambda day, lengths: day.hash_and_get_product(
+            (tuple(range(256)), lengths), day.iterate_as_int),
+        lambda day, lengths: day.get_hash(lengths, day.iterate_as_str),
+        default_input=lambda day: day.INPUT[1])
+register(11, read_text,
+        lambda day, steps: day.final_distance(steps),
+        lambda day, steps: day.furthest_distance(steps))
+register(12, read_text,
+        lambda day, pipes: day.get_number_connected_to_zero(pipes),
+        lambda day, pipes: day.get_number_of_groups(pipes))
+register(13, read_text,
+        lambda day, firewall: day.get_severity(firewall),
+        lambda day, firewall: day.get_delay_uncaught(firewall))
+register(14, read_text,
+        lambda day, key: day.get_used(key),
+        lambda day, key: day.get_regions(key),
+        default_input=render_input)
+register(15, read_ints,
+        lambda day, starts: day.get_equal_16bits(starts),
+        lambda day, starts: day.get_equal_16bits_2(starts),
+        default_input=render_input)
+register(16, read_text,
+        lambda day, moves: day.get_final_position(moves, programs=day.PROGRAMS),
+        lambda day, moves: day.get_final_position(
+            moves, programs=day.PROGRAMS, n_times=1000000000))
+register(17, read_int,
+        lambda day, steps: day.get_one_after(steps),
+        lambda day, steps: day.get_after_zero(steps),
+        default_input=render_input)
+register(18, lambda day, text: text.splitlines(keepends=True),
+        lambda day, program: day.get_recover(program),
+        lambda day, program: day.get_send_program_1(program))
+register(19, read_lines,
+        lambda day, diagram: day.get_word(diagram),
+        lambda day, diagram: day.get_steps(diagram))
+register(20, read_lines,
+        lambda day, lines: day.get_closest_to_zero(lines),
+        lambda day, lines: day.get_collisions(lines))
+register(21, read_lines,
+        lambda day, rules: day.get_on_after_iterations(rules, 5),
+        lambda day, rules: day.get_on_after_iterations(rules, 18))
+register(22, read_lines,
+        lambda day, lines: day.get_infecting_bursts(lines, 10000, day.Virus),
+        lambda day, lines: day.get_infecting_bursts(lines, 10000000, day.NewVirus))
+register(23, read_lines,
+        lambda day, program: day.get_number_mul(program),
+        lambda day, program: day.get_final_value_h(program))
+register(24, read_lines,
+        lambda day, components: day.get_strongest(components),
+        lambda day, components: day.get_longest(components))
+register(25, read_lines,
+        lambda day, blueprint: day.get_checksum(blueprint))
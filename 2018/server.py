@@ -0,0 +1,199 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""Service solving puzzles for clients speaking JSON lines
+
+Each request is a line like {"id": 1, "day": 5, "input": "dabAcCaCBAcCcaDA"},
+answered, maybe out of order, by a line with the same id and the results and
+times of the solve, or an error. Inputs are always text, never paths of files
+of the server. Requests are read from a Unix socket, or from stdin with
+responses on stdout"""
+
+import sys
+import json
+import time
+import asyncio
+import hashlib
+import argparse
+import multiprocessing
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from solvers import PUZZLES, run_puzzle
+from generators import synthetic_input
+
+# Longest request line read from the socket, longer ones get an error
+MAX_REQUEST_SIZE = 1 << 28
+
+def solve_text(day, text):
+    """ Run a puzzle on an input text, in a worker of the pool. The text is
+    written to a file first, so that it is never taken for a path """
+    with synthetic_input([text]) as path:
+        results, solve_time, _ = run_puzzle(day, path)
+    return results, solve_time
+
+class SolveServer(object):
+    """ Solves the requests of clients on a process pool whose workers have
+    the puzzle modules imported
+
+    At most max_pending requests are answered at once, across clients: no
+    more lines are read until one of them is answered. Requests identical to
+    one being solved wait for its results instead of solving again """
+    def __init__(self, workers=None, max_pending=64):
+        # workers are forked from a server process which imported the puzzle
+        # modules once, instead of from this one, which has threads reading
+        # stdin
+        context = multiprocessing.get_context('forkserver')
+        context.set_forkserver_preload(['solvers', 'generators', *PUZZLES.values()])
+        self.executor = ProcessPoolExecutor(workers, mp_context=context)
+        self.pending = asyncio.Semaphore(max_pending)
+        # futures of the solves in progress, by day and hash of the input
+        self.solving = {}
+        self.stats = Counter(requests=0, solved=0, coalesced=0, errors=0)
+
+    async def solve(self, day, input):
+        """ Solve a puzzle on the process pool, return the results, the time
+        of the solve and whether it was shared with another request """
+        key = (day, hashlib.sha256(input.encode()).digest())
+        if key in self.solving:
+            self.stats['coalesced'] += 1
+            return (*await asyncio.shield(self.solving[key]), True)
+        future = asyncio.get_running_loop().run_in_executor(
+                self.executor, solve_text, day, input)
+        self.solving[key] = future
+        try:
+            # shielded, so that other requests still get it if this one is
+            # cancelled
+            return (*await asyncio.shield(future), False)
+        finally:
+            del self.solving[key]
+
+    async def handle_request(self, line):
+        """ Get the response to a request line, None for one too long """
+        start = time.perf_counter()
+        self.stats['requests'] += 1
+        request = {}
+        try:
+            if line is None:
+                raise ValueError("request longer than {} bytes".format(
+                    MAX_REQUEST_SIZE))
+            request = json.loads(line)
+            day, input = request['day'], request['input']
+            if day not in PUZZLES:
+                raise ValueError("unknown puzzle: {}".format(day))
+            if not isinstance(input, str):
+                raise ValueError("input is not a text")
+            results, solve_time, coalesced = await self.solve(day, input)
+        except Exception as e:
+            self.stats['errors'] += 1
+            id = request.get('id') if isinstance(request, dict) else None
+            return dict(id=id, error=repr(e))
+        self.stats['solved'] += 1
+        return dict(
+                id=request.get('id'), day=day, results=list(results),
+                coalesced=coalesced,
+                time=dict(solve=solve_time, wall=time.perf_counter() - start))
+
+    async def answer(self, line, write_line):
+        """ Answer a request line, and free its pending slot """
+        try:
+            await write_line(json.dumps(await self.handle_request(line)))
+        finally:
+            self.pending.release()
+
+    async def serve(self, read_line, write_line):
+        """ Answer the request lines read until the end of the input """
+        answers = set()
+        while True:
+            await self.pending.acquire()
+            line = await read_line()
+            if line is not None and not line.strip():
+                self.pending.release()
+                if not line:
+                    break
+                continue
+            answer = asyncio.create_task(self.answer(line, write_line))
+            answers.add(answer)
+            answer.add_done_callback(answers.discard)
+        await asyncio.gather(*answers)
+
+    async def handle_connection(self, reader, writer):
+        """ Serve a client of the Unix socket """
+        async def read_line():
+            # lines over the limit of the reader are skipped, as None
+            try:
+                return await reader.readuntil(b'\n')
+            except asyncio.IncompleteReadError as e:
+                return e.partial
+            except asyncio.LimitOverrunError as e:
+                consumed = e.consumed
+            while True:
+                await reader.readexactly(consumed)
+                try:
+                    await reader.readuntil(b'\n')
+                    return None
+                except asyncio.IncompleteReadError:
+                    return None
+                except asyncio.LimitOverrunError as e:
+                    consumed = e.consumed
+        async def write_line(line):
+            writer.write(line.encode() + b'\n')
+            await writer.drain()
+        try:
+            await self.serve(read_line, write_line)
+        finally:
+            writer.close()
+
+    async def serve_unix(self, path):
+        """ Serve the clients of a Unix socket, forever """
+        server = await asyncio.start_unix_server(
+                self.handle_connection, path, limit=MAX_REQUEST_SIZE)
+        print("Listening on {}".format(path), file=sys.stderr)
+        async with server:
+            await server.serve_forever()
+
+    async def serve_stdio(self):
+        """ Serve requests from stdin, until its end """
+        loop = asyncio.get_running_loop()
+        async def read_line():
+            # stdin may be a file or a terminal, which asyncio can not read
+            return await loop.run_in_executor(None, sys.stdin.readline)
+        async def write_line(line):
+            sys.stdout.write(line + '\n')
+            sys.stdout.flush()
+        await self.serve(read_line, write_line)
+
+
+def get_parser():
+    """ Construct a parser """
+    parser = argparse.ArgumentParser(
+            description=__doc__,
+            formatter_class=argparse.RawDescriptionHelpFormatter)
+
+    parser.add_argument(
+            '--socket', metavar='PATH',
+            help="Unix socket to listen on, instead of stdin and stdout")
+    parser.add_argument(
+            '--workers', type=int, default=None,
+            help="Number of processes solving puzzles (default: number of CPUs)")
+    parser.add_argument(
+            '--max-pending', type=int, default=64,
+            help="Maximum number of requests answered at once (default: 64)")
+
+    return parser
+
+async def main(args):
+    server = SolveServer(args.workers, args.max_pending)
+    with server.executor:
+        if args.socket:
+            await server.serve_unix(args.socket)
+        else:
+            await server.serve_stdio()
+    print("Requests: {requests}, solved: {solved}, coalesced: {coalesced}, "
+            "errors: {errors}".format(**server.stats), file=sys.stderr)
+
+if __name__ == '__main__':
+    try:
+        asyncio.run(main(get_parser().parse_args()))
+    except KeyboardInterrupt:
+        pass
@@ -4,297 +4,186 @@
 """Solutions to the AdventOfCode2018 by Joaquin Muguerza
 """
 
-import re
+import sys
+import time
 import argparse
-import contextlib
-from io import StringIO
-from pathlib import Path
-from abc import ABC, abstractmethod
-from functools import reduce
-from datetime import datetime
-from operator import itemgetter
-from collections import defaultdict, Counter
-
-@contextlib.contextmanager
-def open_file_or_string(string):
-    if Path(string).is_file():
-        f = open(string, 'r')
-        yield f
-        f.close()
-    else:
-        yield StringIO(string)
-
-
-class Puzzle(ABC):
-    def __init__(self, input=None, *args, **kwargs):
-        self.input = input
-
-    def run(self, part_one=True, part_two=True, *args, **kwargs):
-        self.parse_input()
-        result_part_one = self.part_one() if part_one else None
-        result_part_two = self.part_two() if part_two else None
-        return (result_part_one, result_part_two)
-
-    @abstractmethod
-    def parse_input(self):
-        ...
-
-    @classmethod
-    def add_subparser(cls, subparsers):
-        parser = subparsers.add_parser(
-                str(cls.DAY),
-                help="Execute day {} puzzle".format(cls.DAY))
-        parser.add_argument(
-                'input', type=str,
-                help="Input string or path to file containing input"
-        )
-
-    @property
-    @abstractmethod
-    def DAY(self):
-        raise NotImplementedError
-
-
-class Puzzle1(Puzzle):
-    DAY = 1
-
-    def parse_input(self):
-        with open_file_or_string(self.input) as f:
-            self.changes = list(map(int, f.readlines()))
-
-    def part_one(self):
-        """ First part of the puzzle: return the sum of all numbers in file """
-        total = sum(self.changes)
-        return total
-
-    def part_two(self):
-        """ Get the first number reached twice """
-        total = 0
-        reached = {0}
-        twice_found = False
-        while not twice_found:
-            for change in self.changes:
-                total += change
-                if total in reached:
-                    twice_found = True
-                    break
-                reached.add(total)
-        return total
-
-class Puzzle2(Puzzle):
-    DAY = 2
-
-    def parse_input(self):
-        with open_file_or_string(self.input) as f:
-            self.words = list(map(str.strip, f.readlines()))
-
-    def part_one(self):
-        """ First part of the puzzle: count the number of words that contain
-        exactly 2 and 3 of the same character, and return the product"""
-        words_with_two = 0
-        words_with_three = 0
-        for word in self.words:
-            letters = self.get_occurrences(word)
-            words_with_two += 1 if 2 in letters.values() else 0
-            words_with_three += 1 if 3 in letters.values() else 0
-        return words_with_two * words_with_three
-
-    def get_occurrences(self, word):
-        """ Get the occurences per letter """
-        return {
-                letter: word.count(letter) for letter in set(word)
-        }
-
-    def part_two(self):
-        """ Get the two words that only differ in one character """
-        # NOTE: consider that all words have the same length
-        # Remove the i-th character of all words, check if two are the same
-        for i in range(len(self.words[0])):
-            cut_words = set()
-            for word in self.words:
-                cut_word = word[0:i] + word[i+1:]
-                if cut_word in cut_words:
-                    return cut_word
-                cut_words.add(cut_word)
-
-
-class Puzzle3(Puzzle):
-    DAY = 3
-
-    def parse_input(self):
-        with open_file_or_string(self.input) as f:
-            self.requests = {}
-            REQUEST = re.compile(r'#(?P<id>\d+) @ (?P<x>\d+),(?P<y>\d+): (?P<length>\d+)x(?P<height>\d+)')
-            for line in f.readlines():
-                match = REQUEST.match(line)
-                try:
-                    request = { key: int(val) for key, val in match.groupdict().items() }
-                except (AttributeError, KeyError):
-                    continue
-                self.requests[request['id']] = request
-
-    def part_one(self):
-        """ Find the sq inches claimed by more than one party """
-        self.claims = defaultdict(set)
-        for request in self.requests.values():
-            self.claim(request, self.claims)
-        return len(list(pos for pos, claim in self.claims.items() if len(claim) > 1))
-
-    def claim(self, request, claims):
-        """ Update claims with request """
-        for x in range(request['x'], request['x'] + request['length']):
-            for y in range(request['y'], request['y'] + request['height']):
-                claims[(x,y)].add(request['id'])
-
-    def part_two(self):
-        """ Get the one claim that does not overlap """
-        # get all overlapping claims
-        overlapping_ids = reduce(
-                set.union,
-                ( claims for claims in self.claims.values() if len(claims) > 1 ),
-                set())
-        return next(( id for id in self.requests if id not in overlapping_ids ))
-
-
-class Puzzle4(Puzzle):
-    DAY = 4
-
-    FALLS_ASLEEP = -1
-    WAKES_UP = -2
-    # SHIFT_STARTS = ID
-
-    def parse_input(self):
-        with open_file_or_string(self.input) as f:
-            self.logs = []
-            LOG_ENTRY = re.compile(r'\[(?P<year>\d+)-(?P<month>\d+)-(?P<day>\d+) (?P<hour>\d+):(?P<minute>\d+)\] (?P<action>.+)')
-            ACTION_SHIFT_STARTS = re.compile(r'Guard #(?P<id>\d+) begins shift')
-            ACTION_FALLS_ASLEEP = re.compile(r'falls asleep')
-            ACTION_WAKES_UP = re.compile(r'wakes up')
-            for line in f.readlines():
-                try:
-                    match = LOG_ENTRY.match(line).groupdict()
-                except AttributeError:
-                    continue
-                # get the action
-                action_shift_starts = ACTION_SHIFT_STARTS.match(match['action'])
-                action_falls_asleep = ACTION_FALLS_ASLEEP.match(match['action'])
-                action_wakes_up = ACTION_WAKES_UP.match(match['action'])
-                try:
-                    action = ( self.FALLS_ASLEEP if action_falls_asleep else
-                            self.WAKES_UP if action_wakes_up else
-                            int(action_shift_starts.groupdict()['id']))
-                except AttributeError:
-                    continue
-                date = datetime(
-                        int(match['year']),
-                        int(match['month']),
-                        int(match['day']),
-                        int(match['hour']),
-                        int(match['minute']))
-                self.logs.append({ 'date' : date, 'action' : action})
-        self.logs.sort(key=itemgetter('date'))
-
-    def part_one(self):
-        """ Get the ID and most probable minute a guard is asleep """
-        # get the times each guard is asleep
-        sleep_schedule = self.get_sleep_schedule(self.logs)
-        # get the guard ID that sleeps the most
-        guard_id = Counter(
-                reduce(list.__add__, sleep_schedule.values(), [])).most_common()[0][0]
-        # get the minute where the guard sleeps the most
-        minute = max(sleep_schedule, key=lambda x: sleep_schedule[x].count(guard_id))
-        return minute * guard_id
-
-
-    def get_sleep_schedule(self, logs):
-        """ get all the times guards are asleep """
-        # Assuming that:
-        # - logs are complete
-        # - one guard per night
-        sleep_schedule = defaultdict(list) # sleep schedule between 00.00 and 00.59
-        for log in logs:
-            if log['action'] == self.FALLS_ASLEEP:
-                fell_asleep_minute = log['date'].minute 
-            elif log['action'] == self.WAKES_UP:
-                for minute in range(fell_asleep_minute, log['date'].minute):
-                    sleep_schedule[minute].append(guard_id)
-            else:
-                guard_id = log['action']
-
-        return sleep_schedule
-
-    def part_two(self):
-        """ Get the ID and most probable minute a guard is asleep """
-        # get the times each guard is asleep
-        sleep_schedule = self.get_sleep_schedule(self.logs)
-        # get the guard ID that sleeps the most
-        guard_id = Counter(
-                reduce(list.__add__, sleep_schedule.values(), [])).most_common()[0][0]
-        # get the minute where the guard sleeps the most
-        minute = max(sleep_schedule, key=lambda x: Counter(sleep_schedule[x]).most_common()[0][1])
-        # get the guard Id that sleep the most
-        return minute * Counter(sleep_schedule[minute]).most_common()[0][0]
-
-
-class Puzzle5(Puzzle):
-    DAY = 5
-
-    def parse_input(self):
-        with open_file_or_string(self.input) as f:
-            self.polymer = f.read().rstrip()
-
-    def part_one(self, polymer=None):
-        """ Get the lenght of the remaining polymer  """
-        if not polymer:
-            polymer = self.polymer
-        remaining_polymer = self.react_polymer(polymer)
-        return len(remaining_polymer)
-
-    def react_polymer(self, polymer):
-        """ Remove every pair of adjacent capitalized and non-capitalized letters """
-        a = []
-        b = list(polymer)
-
-        def match(a, b):
-            return a != b and a.lower() == b.lower()
-
-        try:
-            while True:
-                a.append(b.pop(0))
-                # check if the last letter of a and the first of b match
-                while len(a) and match(a[-1], b[0]):
-                    # remove reacting components
-                    a.pop()
-                    b.pop(0)
-        except IndexError:
-            # index error because b is empty
-            # the whole list has been iterated through
-            return a
-
-    def part_two(self):
-        """ Get part one, but removing each time a letter """
-        return min(
-                self.part_one(
-                    polymer=list(filter(lambda x: x != letter and x != letter.upper(), self.polymer)))
-                for letter in set(map(str.lower, self.polymer))
-        )
-
-
-
+import importlib
+
+# Module of each puzzle, only imported when the puzzle is needed
+PUZZLES = {
+        1: 'day1',
+        2: 'day2',
+        3: 'day3',
+        4: 'day4',
+        5: 'day5',
+}
+
+# Module registering the puzzles of other years, in its own PUZZLES
+YEARS = {
+        2017: 'puzzles2017',
+}
+
+# Inputs of the 2018 puzzles run by 'all', the other years have default ones
+DEFAULT_INPUTS = ['input_day{day}.txt']
+
+# Options of the puzzles that 'all' passes to each of them
+RUN_OPTIONS = (
+        'parse_cache', 'parse_cache_size', 'result_cache', 'result_cache_ttl',
+        'profile', 'profile_dump')
 
 def get_puzzle_classes():
     """ Return an iterator of all Puzzle classes """
-    return (
-            cls for class_name, cls in globals().items()
-            if re.match('^Puzzle[0-9]+$', class_name)
+    return (get_puzzle_class(puzzle_number) for puzzle_number in PUZZLES)
+
+def get_puzzle_class(puzzle_number, year=None):
+    """ Return the class of one puzzle, of 2018 unless another year is given """
+    if year in YEARS:
+        return get_puzzles(year)[int(puzzle_number)]
+    module = importlib.import_module(PUZZLES[int(puzzle_number)])
+    return getattr(module, 'Puzzle{}'.format(puzzle_number))
+
+def get_puzzles(year=None):
+    """ Return the registry of the puzzles of a year """
+    if year in YEARS:
+        return importlib.import_module(YEARS[year]).PUZZLES
+    return PUZZLES
+
+def run_puzzle(puzzle_number, input, year=None, **options):
+    """ Run a puzzle on an input, with options of its class such as caches
+    and profiling, return the results, the wall time and the report """
+    start = time.perf_counter()
+    puzzle = get_puzzle_class(puzzle_number, year)(input, **options)
+    results = puzzle.run()
+    return results, time.perf_counter() - start, puzzle.report
+
+def get_jobs(years, puzzle_numbers=None, patterns=None):
+    """ Get the (year, puzzle number, input) jobs of the puzzles of the
+    years, all of them or those with the given numbers. The inputs of each
+    puzzle match the patterns formatted with its year and number. Without
+    patterns, the 2018 puzzles run on DEFAULT_INPUTS and the others on
+    their default input """
+    import glob
+    jobs = []
+    for year in years:
+        puzzles = get_puzzles(year)
+        if puzzle_numbers is None:
+            numbers = sorted(puzzles)
+        else:
+            numbers = [number for number in puzzle_numbers if number in puzzles]
+        year_patterns = patterns
+        if year_patterns is None and year not in YEARS:
+            year_patterns = DEFAULT_INPUTS
+        if year_patterns is None:
+            jobs += [(year, number, None) for number in numbers]
+            continue
+        jobs += [
+                (year, number, input)
+                for number in numbers
+                for pattern in year_patterns
+                for input in sorted(glob.glob(pattern.format(day=number, year=year)))
+        ]
+    return jobs
+
+def get_job_key(item):
+    """ Sort key of the (job, value) items of run_all, the inputs of a year
+    are all None or all paths """
+    year, puzzle_number, input = item[0]
+    return year, puzzle_number, input or ''
+
+def run_all(jobs, workers=None, **options):
+    """ Run the jobs on a process pool, print the results as they complete,
+    and the wall time of each job and the reports of the profiled runs at
+    the end """
+    # only imported here, it is slow to import for running a single puzzle
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    times, reports = {}, {}
+    with ProcessPoolExecutor(workers) as executor:
+        futures = {
+                executor.submit(run_puzzle, puzzle_number, input, year, **options): (
+                    year, puzzle_number, input)
+                for year, puzzle_number, input in jobs
+        }
+        for future in as_completed(futures):
+            job = year, puzzle_number, input = futures[future]
+            try:
+                results, times[job], reports[job] = future.result()
+            except Exception as e:
+                print("Puzzle {} {} {}: failed: {!r}".format(year, puzzle_number, input, e))
+                continue
+            print("Puzzle {} {} {}: part one: {}, part two: {}".format(
+                year, puzzle_number, input, *results))
+    print()
+    print("{:>4} {:>6}  {:<40} {:>10}".format('Year', 'Puzzle', 'Input', 'Wall time'))
+    for (year, puzzle_number, input), wall_time in sorted(times.items(), key=get_job_key):
+        print("{:>4} {:>6}  {:<40} {:>9.3f}s".format(
+            year, puzzle_number, str(input), wall_time))
+    if options.get('profile') or options.get('profile_dump'):
+        import json
+        print(json.dumps([
+            dict(report, input=input) for (_, _, input), report
+            in sorted(reports.items(), key=get_job_key)], indent=4))
+
+def add_all_subparser(subparsers):
+    """ Add the subparser running many puzzles and inputs at once """
+    parser = subparsers.add_parser(
+            'all',
+            help="Execute many puzzles on many inputs in parallel",
+            formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument(
+            '--years', type=int, nargs='+', choices=[2018, *YEARS], default=[2018],
+            help="Years of the puzzles")
+    parser.add_argument(
+            '--puzzles', type=int, nargs='+',
+            help="Puzzles to execute, in each year that has them (default: all "
+            "the puzzles of the years)")
+    parser.add_argument(
+            '--inputs', nargs='+',
+            help="Glob patterns of the inputs, {day} and {year} are replaced by "
+            "those of the puzzle (default: input_day{day}.txt for 2018, the "
+            "inputs of the 2017 directory for 2017)")
+    parser.add_argument(
+            '--workers', type=int, default=None,
+            help="Number of processes (default: number of CPUs)")
+    parser.add_argument(
+            '--parse-cache', metavar='DIRECTORY',
+            help="Cache the parsed inputs in this directory")
+    parser.add_argument(
+            '--parse-cache-size', type=int, default=1024, metavar='MB',
+            help="Size above which least recently used parsed inputs are removed")
+    parser.add_argument(
+            '--result-cache', metavar='DIRECTORY',
+            help="Cache the results in this directory")
+    parser.add_argument(
+            '--result-cache-ttl', type=float, metavar='SECONDS',
+            help="Time after which cached results are recomputed")
+    parser.add_argument(
+            '--profile', action='store_true',
+            help="Print the JSON reports with the time and memory of each phase")
+    parser.add_argument(
+            '--profile-dump', metavar='DIRECTORY',
+            help="Profile each phase, and dump its cProfile stats in this directory")
+    return parser
+
+def add_lazy_subparser(subparsers, puzzle_number):
+    """ Add the subparser of a puzzle from the registry, without importing it """
+    parser = subparsers.add_parser(
+            str(puzzle_number),
+            help="Execute day {} puzzle".format(puzzle_number))
+    parser.add_argument(
+            'input', type=str,
+            help="Input string or path to file containing input"
     )
+    return parser
 
-def get_puzzle_class(puzzle_number):
-    """ Return the class of one puzzle """
-    return globals()['Puzzle{}'.format(puzzle_number)]
+def get_parser(args=None):
+    """ Construct a parser with all submodules
+
+    Only the module of the puzzle requested in args (sys.argv by default)
+    is imported, to get its own options. The other subparsers are built
+    from the registry """
+    args = sys.argv[1:] if args is None else args
+    requested = next((arg for arg in args if not arg.startswith('-')), None)
 
-def get_parser():
-    """ Construct a parser with all submodules """
     parser = argparse.ArgumentParser(
             description=__doc__,
             formatter_class=argparse.ArgumentDefaultsHelpFormatter)
@@ -307,15 +196,30 @@ def get_parser():
     )
     subparsers.required = True
 
-    # Add subparser of each puzzle class
-    for puzzle_class in get_puzzle_classes():
-        puzzle_class.add_subparser(subparsers)
+    # Add subparser of each puzzle
+    for puzzle_number in PUZZLES:
+        if str(puzzle_number) == requested:
+            get_puzzle_class(puzzle_number).add_subparser(subparsers)
+        else:
+            add_lazy_subparser(subparsers, puzzle_number)
+    add_all_subparser(subparsers)
 
     return parser
 
 if __name__ == '__main__':
     args = get_parser().parse_args()
-    puzzle = get_puzzle_class(args.puzzle_number)(**vars(args))
-    results = puzzle.run()
-    print("Part one: {}".format(results[0]))
-    print("Part two: {}".format(results[1]))
+    if args.puzzle_number == 'all':
+        run_all(get_jobs(args.years, args.puzzles, args.inputs), args.workers,
+                **{ option: getattr(args, option) for option in RUN_OPTIONS })
+    else:
+        puzzle = get_puzzle_class(args.puzzle_number)(**vars(args))
+        results = puzzle.run()
+        print("Part one: {}".format(results[0]))
+        print("Part two: {}".format(results[1]))
+        if puzzle.result_cache is not None:
+            print("Result cache: {}".format(', '.join(
+                '{} {}'.format(count, name.replace('_', ' '))
+                for name, count in puzzle.result_cache.stats.items())))
+        if puzzle.profile:
+            import json
+            print(json.dumps(puzzle.report, indent=4))
@@ -3,52 +3,172 @@
 
 """Test-suite for puzzle solvers"""
 
+import os
 import re
+import sys
+import json
+import math
+import time
+import signal
 import argparse
-from abc import ABC
+import tempfile
+import statistics
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from abc import ABC, abstractmethod
 
 from solvers import *
+from cache import ParseCache, ResultCache
+from generators import synthetic_input, generate
+
+class TestTimeout(Exception):
+    """ Raised in a test case running out of time """
+
+def raise_timeout(signum, frame):
+    raise TestTimeout
+
+def is_passed(outcome):
+    """ Check if a test case ran and got the expected results """
+    return outcome['error'] is None and all(
+            result == expected for _, result, expected in outcome['checks'])
+
+def get_puzzle_label(year, day):
+    """ Label a puzzle by its day, and by its year too unless it is of 2018 """
+    return str(day) if year == 2018 else '{}/{}'.format(year, day)
+
+def print_outcome(outcome):
+    """ Print the results of a test case """
+    if outcome['input'] is None:
+        print("Testing Puzzle {} with its default input".format(
+            get_puzzle_label(outcome['year'], outcome['day'])))
+    else:
+        print("Testing Puzzle {} with input '{}'".format(
+            get_puzzle_label(outcome['year'], outcome['day']),
+            outcome['input'].encode('unicode-escape').decode()))
+    if outcome['error'] is not None:
+        print("\tError: {} ... FAIL".format(outcome['error']))
+    for name, result, expected in outcome['checks']:
+        print("\t{}: got result: {}, was expecting: {} ... {}".format(
+            name, result, expected, 'PASS' if result == expected else 'FAIL'))
 
 class TestPuzzle(ABC):
+    YEAR = 2018
+
     def __init__(self, *args, **kwargs):
         super()
-        self.test_class = globals()['Puzzle{}'.format(self.DAY)]
+        self.test_class = get_puzzle_class(self.DAY, self.YEAR)
         self.test_cases = []
+        self.cache_directory = None
         self.load_test_cases()
 
     @abstractmethod
     def load_test_cases(self):
         pass
 
-    def run(self, *args, **kwargs):
-        for test_case in self.test_cases:
-            print("Testing Puzzle {} with input '{}'".format(
-                self.DAY, test_case['input'].encode('unicode-escape').decode()))
-            # Instantiate a class
-            puzzle = self.test_class(test_case['input'])
-            # Run puzzle
-            results = puzzle.run(part_one='result_part_one' in test_case,
-                    part_two='result_part_two' in test_case)
+    def run(self, timeout=None, *args, **kwargs):
+        for index in range(len(self.test_cases)):
+            print_outcome(self.run_test_case(index, timeout))
+
+    def run_test_case(self, index, timeout=None):
+        """ Run one test case, stopping it after timeout seconds if given,
+        and return its outcome. A test case run several times must get the
+        same results each time """
+        test_case = self.test_cases[index]
+        outcome = dict(year=self.YEAR, day=self.DAY, index=index,
+                input=test_case['input'], checks=[], error=None)
+        if timeout:
+            handler = signal.signal(signal.SIGALRM, raise_timeout)
+        start = time.perf_counter()
+        try:
+            if timeout:
+                signal.setitimer(signal.ITIMER_REAL, timeout)
+            results = None
+            for run in range(test_case['runs']):
+                # Instantiate a class
+                puzzle = self.test_class(test_case['input'], **test_case['options'])
+                # Run puzzle
+                run_results = puzzle.run(part_one='result_part_one' in test_case,
+                        part_two='result_part_two' in test_case)
+                if results is not None and run_results != results:
+                    raise ValueError("run {} got {}, the first run got {}".format(
+                        run + 1, run_results, results))
+                results = run_results
+        except TestTimeout:
+            outcome['error'] = 'timed out after {}s'.format(timeout)
+        except Exception as e:
+            outcome['error'] = repr(e)
+        finally:
+            outcome['time'] = time.perf_counter() - start
+            if timeout:
+                signal.setitimer(signal.ITIMER_REAL, 0)
+                signal.signal(signal.SIGALRM, handler)
+        if outcome['error'] is None:
             # Compare results
-            if 'result_part_one' in test_case:
-                print("\tPart one: got result: {}, was expecting: {} ... {}".format(
-                    results[0], test_case['result_part_one'],
-                    'PASS' if results[0] == test_case['result_part_one'] else 'FAIL'))
-            if 'result_part_two' in test_case:
-                print("\tPart two: got result: {}, was expecting: {} ... {}".format(
-                    results[1], test_case['result_part_two'],
-                    'PASS' if results[1] == test_case['result_part_two'] else 'FAIL'))
+            for part, result in zip(('one', 'two'), results):
+                if 'result_part_' + part in test_case:
+                    outcome['checks'].append(('Part ' + part, result,
+                        test_case['result_part_' + part]))
+            # Compare the counters of the caches, after the last run
+            for cache, stats in test_case['cache_stats'].items():
+                for counter, expected in stats.items():
+                    outcome['checks'].append(('{} {}'.format(cache, counter),
+                        getattr(puzzle, cache).stats[counter], expected))
+        return outcome
+
+    def benchmark(self, sizes, repeat=5):
+        """ Run the puzzle on generated inputs of increasing sizes, get the
+        median and p95 times, the peak memory and the fitted exponent of the
+        time complexity """
+        report = dict(sizes=list(sizes), median=[], p95=[], peak_memory=[])
+        for size in sizes:
+            with synthetic_input(generate(self.DAY, size)) as path:
+                # untimed warm-up, reading the input in the page cache
+                self.test_class(path).run()
+                times = []
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    self.test_class(path).run()
+                    times.append(time.perf_counter() - start)
+                # memory is traced in a run of its own, as tracing slows it
+                puzzle = self.test_class(path, profile=True)
+                puzzle.run()
+            report['median'].append(statistics.median(times))
+            report['p95'].append(percentile(times, 95))
+            report['peak_memory'].append(max(
+                phase['peak_memory'] for phase in puzzle.report['phases'].values()))
+            print("Benchmarking Puzzle {} with {} records: median {:.4f}s, "
+                    "p95 {:.4f}s, peak memory {:.1f} MB".format(
+                        self.DAY, size, report['median'][-1], report['p95'][-1],
+                        report['peak_memory'][-1] / (1 << 20)))
+        report['exponent'] = fit_exponent(*get_measurable(
+            report['sizes'], report['median']))
+        if report['exponent'] is not None:
+            print("\tTime complexity: O(n^{:.2f})".format(report['exponent']))
+        return report
 
     def add_test_case(self, input_string,
             result_part_one=None,
-            result_part_two=None):
-        test_case = dict(input=input_string)
+            result_part_two=None,
+            runs=1,
+            cache_stats={},
+            **options):
+        """ Add a test case, run with the puzzle options. It can be run
+        several times, then cache_stats gives the expected counters of the
+        caches of the puzzle by attribute, after the last run """
+        test_case = dict(input=input_string, options=options, runs=runs,
+                cache_stats=cache_stats)
         if result_part_one is not None:
             test_case.update(dict(result_part_one=result_part_one))
         if result_part_two is not None:
             test_case.update(dict(result_part_two=result_part_two))
         self.test_cases.append(test_case)
 
+    def get_cache_directory(self):
+        """ Get a new empty directory for the caches of a test case, removed
+        with the tester """
+        if self.cache_directory is None:
+            self.cache_directory = tempfile.TemporaryDirectory()
+        return tempfile.mkdtemp(dir=self.cache_directory.name)
+
     @property
     @abstractmethod
     def DAY(self):
@@ -65,6 +185,13 @@ class TestPuzzle1(TestPuzzle):
         self.add_test_case('+3\n+3\n+4\n-2\n-4', result_part_two=10)
         self.add_test_case('-6\n+3\n+8\n+5\n-6', result_part_two=5)
         self.add_test_case('+7\n+7\n-2\n-7\n-4', result_part_two=14)
+        self.add_test_case('+10000000\n-9999999', result_part_two=10000000)
+        self.add_test_case('-10000000\n+9999999\n+3', result_part_two=0)
+        # the second run reads the parsed input from the cache
+        self.add_test_case('+3\n+3\n+4\n-2\n-4',
+                result_part_one=4, result_part_two=10, runs=2,
+                parse_cache=ParseCache(self.get_cache_directory()),
+                cache_stats=dict(parse_cache=dict(hits=1, misses=1, evictions=0)))
 
 class TestPuzzle2(TestPuzzle):
     DAY = 2
@@ -74,10 +201,28 @@ class TestPuzzle2(TestPuzzle):
                 "abcdef", "bababc", "abbcde", "abcccd",
                 "aabcdd", "abcdee", "ababab")
         self.add_test_case('\n'.join(test_input), result_part_one=12)
+        self.add_test_case('\n'.join(test_input), result_part_one=12, batch=True)
+        test_input = (
+                "abcdef", "bababc", "abbcde", "abcccd",
+                "aabcdd", "abcdee", "ababab", "aa", "bbbxx")
+        self.add_test_case('\n'.join(test_input), result_part_one=24, batch=True)
+        # a shorter last id, with and without a final newline
+        self.add_test_case('abcdef\nbababc\naab', result_part_one=2, batch=True)
+        self.add_test_case('abcdef\nbababc\naab\n', result_part_one=2, batch=True)
+        # ids too long for the counts of the matrix
+        self.add_test_case('abcdef\nbababc\nxxyyy' + 'z' * 300, result_part_one=4, batch=True)
         test_input = (
                 "abcde", "fghij", "klmno", "pqrst", "fguij",
                 "axcye", "wvxyz")
         self.add_test_case('\n'.join(test_input), result_part_two='fgij')
+        self.add_test_case('\n'.join(test_input), result_part_two='fgij', batch=True)
+        # repeated ids and ids of other lengths are not near duplicates
+        test_input = ("abcde", "fghij", "abcde", "fgh", "fguij", "abcdef")
+        self.add_test_case('\n'.join(test_input), result_part_two='fgij')
+        self.add_test_case('\n'.join(test_input),
+                result_part_one=0, result_part_two='fgij', batch=True, runs=2,
+                parse_cache=ParseCache(self.get_cache_directory()),
+                cache_stats=dict(parse_cache=dict(hits=1, misses=1, evictions=0)))
 
 class TestPuzzle3(TestPuzzle):
     DAY = 3
@@ -87,6 +232,29 @@ class TestPuzzle3(TestPuzzle):
                 "#1 @ 1,3: 4x4", "#2 @ 3,1: 4x4", "#3 @ 5,5: 2x2")
         self.add_test_case('\n'.join(test_input),
                 result_part_one=4, result_part_two=3)
+        test_input = (
+                "#1 @ 0,0: 2x2", "#2 @ 2,0: 2x2", "#3 @ 1,1: 2x2",
+                "#4 @ 5,5: 1x1")
+        self.add_test_case('\n'.join(test_input),
+                result_part_one=2, result_part_two=4)
+        self.add_test_case('\n'.join(test_input),
+                result_part_one=2, result_part_two=4, backend='sweep')
+        test_input = (
+                "#1 @ 1000000000,3: 4x4", "#2 @ 1000000002,1: 999999999x4",
+                "#3 @ 5,5: 2x2")
+        self.add_test_case('\n'.join(test_input),
+                result_part_one=4, result_part_two=3, backend='sweep')
+        # the second run gets the results from memory
+        self.add_test_case('\n'.join(test_input),
+                result_part_one=4, result_part_two=3, backend='sweep', runs=2,
+                result_cache=ResultCache(),
+                cache_stats=dict(result_cache=dict(memory_hits=2, disk_hits=0, misses=2)))
+        # with one result in memory, the least recently used one is read
+        # from the disk, and replaces the other one in memory
+        self.add_test_case('\n'.join(test_input),
+                result_part_one=4, result_part_two=3, backend='sweep', runs=2,
+                result_cache=ResultCache(self.get_cache_directory(), max_entries=1),
+                cache_stats=dict(result_cache=dict(memory_hits=0, disk_hits=2, misses=2)))
 
 class TestPuzzle4(TestPuzzle):
     DAY = 4
@@ -94,6 +262,15 @@ class TestPuzzle4(TestPuzzle):
     def load_test_cases(self):
         self.add_test_case('input_day4_test.txt',
                 result_part_one=240, result_part_two=4455)
+        with open('input_day4_test.txt') as f:
+            lines = f.read().splitlines()
+        self.add_test_case('\n'.join(lines[:3] + lines[8:11]),
+                merge=['\n'.join(lines[3:8]), '\n'.join(lines[11:])],
+                result_part_one=240, result_part_two=4455)
+        self.add_test_case('input_day4_test.txt',
+                result_part_one=240, result_part_two=4455, runs=2,
+                parse_cache=ParseCache(self.get_cache_directory()),
+                cache_stats=dict(parse_cache=dict(hits=1, misses=1, evictions=0)))
 
 
 class TestPuzzle5(TestPuzzle):
@@ -102,8 +279,184 @@ class TestPuzzle5(TestPuzzle):
     def load_test_cases(self):
         self.add_test_case('dabAcCaCBAcCcaDA',
                 result_part_one=10, result_part_two=4)
+        # parsed inputs above the size of the cache are removed
+        self.add_test_case('dabAcCaCBAcCcaDA',
+                result_part_one=10, result_part_two=4, runs=2,
+                parse_cache=ParseCache(self.get_cache_directory(), max_size=0),
+                cache_stats=dict(parse_cache=dict(hits=0, misses=2, evictions=2)))
+        # results expire in memory and on disk, and are solved again
+        self.add_test_case('dabAcCaCBAcCcaDA',
+                result_part_one=10, result_part_two=4, runs=2,
+                result_cache=self.get_cache_directory(), result_cache_ttl=0,
+                cache_stats=dict(result_cache=dict(
+                    memory_hits=0, disk_hits=0, expired=4, misses=4)))
 
 
+# Increase of the fitted exponent reported as a regression
+EXPONENT_TOLERANCE = 0.2
+# Increases of the median time below this, in seconds, are noise
+TIME_RESOLUTION = 1e-3
+class Test2017Puzzle1(TestPuzzle):
+    YEAR = 2017
+    DAY = 1
+
+    def load_test_cases(self):
+        self.add_test_case('1122', result_part_one=3)
+        self.add_test_case('91212129', result_part_one=9)
+        self.add_test_case('1212', result_part_two=6)
+        self.add_test_case('12131415', result_part_two=4)
+
+class Test2017Puzzle14(TestPuzzle):
+    YEAR = 2017
+    DAY = 14
+
+    def load_test_cases(self):
+        # day 14 imports day 10
+        self.add_test_case('flqrgnkx', result_part_one=8108, result_part_two=1242)
+
+class Test2017Puzzle18(TestPuzzle):
+    YEAR = 2017
+    DAY = 18
+
+    def load_test_cases(self):
+        self.add_test_case(None, result_part_one=1187, result_part_two=5969)
+        # the results are keyed by the sources of day18 and machine
+        self.add_test_case(None, result_part_one=1187, result_part_two=5969, runs=2,
+                result_cache=ResultCache(self.get_cache_directory()),
+                cache_stats=dict(result_cache=dict(memory_hits=2, disk_hits=0, misses=2)))
+
+class Test2017Puzzle23(TestPuzzle):
+    YEAR = 2017
+    DAY = 23
+
+    def load_test_cases(self):
+        self.add_test_case(None, result_part_one=3969, result_part_two=917)
+
+
+def percentile(values, p):
+    """ Get the nearest-rank p-th percentile of the values """
+    values = sorted(values)
+    return values[max(math.ceil(p / 100 * len(values)) - 1, 0)]
+
+def get_measurable(sizes, times):
+    """ Get the sizes and times whose times are above TIME_RESOLUTION, the
+    others are mostly noise """
+    measurable = [
+            (size, t) for size, t in zip(sizes, times) if t > TIME_RESOLUTION]
+    return [size for size, _ in measurable], [t for _, t in measurable]
+
+def fit_exponent(sizes, times):
+    """ Get k fitting times = c * sizes^k, by least squares on the logs """
+    if len(set(sizes)) < 2:
+        return None
+    xs = [math.log(size) for size in sizes]
+    ys = [math.log(max(t, 1e-9)) for t in times]
+    mean_x, mean_y = statistics.mean(xs), statistics.mean(ys)
+    return (sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys))
+            / sum((x - mean_x) ** 2 for x in xs))
+
+def get_regressions(reports, baseline, tolerance):
+    """ Compare benchmark reports with baseline ones, return the regressions """
+    regressions = []
+    for puzzle_number, report in reports.items():
+        if puzzle_number not in baseline:
+            continue
+        base = baseline[puzzle_number]
+        base_sizes = dict(zip(base['sizes'], zip(base['median'], base['peak_memory'])))
+        # exponents are fitted again over the sizes measurable in both
+        measurable = []
+        for size, median, peak_memory in zip(
+                report['sizes'], report['median'], report['peak_memory']):
+            if size not in base_sizes:
+                continue
+            base_median, base_peak_memory = base_sizes[size]
+            if min(median, base_median) > TIME_RESOLUTION:
+                measurable.append((size, median, base_median))
+            if (median > base_median * (1 + tolerance)
+                    and median - base_median > TIME_RESOLUTION):
+                regressions.append(
+                        "Puzzle {} with {} records: median {:.4f}s, was {:.4f}s".format(
+                            puzzle_number, size, median, base_median))
+            if peak_memory > base_peak_memory * (1 + tolerance):
+                regressions.append(
+                        "Puzzle {} with {} records: peak memory {} B, was {} B".format(
+                            puzzle_number, size, peak_memory, base_peak_memory))
+        exponent = fit_exponent(
+                [size for size, _, _ in measurable],
+                [median for _, median, _ in measurable])
+        base_exponent = fit_exponent(
+                [size for size, _, _ in measurable],
+                [base_median for _, _, base_median in measurable])
+        if (exponent is not None
+                and exponent > base_exponent + EXPONENT_TOLERANCE):
+            regressions.append(
+                    "Puzzle {}: time complexity O(n^{:.2f}), was O(n^{:.2f})".format(
+                        puzzle_number, exponent, base_exponent))
+    return regressions
+
+def run_benchmarks(args):
+    """ Benchmark the puzzles, save and compare the reports as asked,
+    return the exit status """
+    reports = {
+            str(puzzle_number): get_test_class(puzzle_number)().benchmark(
+                args.sizes, args.repeat)
+            for puzzle_number in args.puzzle_number
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(reports, f, indent=4)
+    if not args.baseline:
+        return 0
+    with open(args.baseline) as f:
+        regressions = get_regressions(reports, json.load(f), args.tolerance)
+    for regression in regressions:
+        print("REGRESSION: {}".format(regression))
+    return 1 if regressions else 0
+
+
+def get_test_classes():
+    """ Get the test classes of all the puzzles, by year and day """
+    return sorted(TestPuzzle.__subclasses__(),
+            key=lambda test_class: (test_class.YEAR, test_class.DAY))
+
+def run_test_case(puzzle_number, index, timeout, year=2018):
+    """ Run one test case of a puzzle, in a worker of run_parallel """
+    return get_test_class(puzzle_number, year)().run_test_case(index, timeout)
+
+def run_parallel(test_classes, workers, timeout):
+    """ Run the test cases of the puzzles on a process pool, print their
+    results and a summary with timings, return the exit status """
+    start = time.perf_counter()
+    with ProcessPoolExecutor(workers) as executor:
+        futures = [
+                executor.submit(run_test_case, test_class.DAY, index, timeout,
+                    test_class.YEAR)
+                for test_class in test_classes
+                for index in range(len(test_class().test_cases))
+        ]
+        outcomes = [future.result() for future in as_completed(futures)]
+    wall_time = time.perf_counter() - start
+    outcomes.sort(key=lambda outcome: (
+        outcome['year'], outcome['day'], outcome['index']))
+    for outcome in outcomes:
+        print_outcome(outcome)
+    print()
+    print("{:>7} {:>6} {:>6} {:>10} {:>10}".format(
+        'puzzle', 'cases', 'passed', 'total', 'slowest'))
+    for test_class in test_classes:
+        class_outcomes = [
+                outcome for outcome in outcomes
+                if (outcome['year'], outcome['day']) == (test_class.YEAR, test_class.DAY)]
+        times = [outcome['time'] for outcome in class_outcomes]
+        passed = sum(map(is_passed, class_outcomes))
+        print("{:>7} {:>6} {:>6} {:>9.3f}s {:>9.3f}s".format(
+            get_puzzle_label(test_class.YEAR, test_class.DAY), len(times), passed,
+            sum(times), max(times, default=0)))
+    passed = sum(map(is_passed, outcomes))
+    print("{} of {} test cases passed in {:.3f}s ({:.3f}s of test time)".format(
+        passed, len(outcomes), wall_time, sum(outcome['time'] for outcome in outcomes)))
+    return 0 if passed == len(outcomes) else 1
+
 
 def get_parser():
     """ Construct a parser """
@@ -112,18 +465,70 @@ def get_parser():
             formatter_class=argparse.ArgumentDefaultsHelpFormatter)
 
     parser.add_argument(
-            'puzzle_number', type=int,
-            choices=list(puzzle.DAY for puzzle in get_puzzle_classes()),
-            help='Puzzle number to test', metavar='puzzle_number')
+            'puzzle_number', type=int, nargs='*',
+            help='Puzzle numbers to test, all the tested ones of the year by default')
+    parser.add_argument(
+            '--year', type=int, default=2018, choices=[2018, *YEARS],
+            help='Year of the puzzles to test')
+    parser.add_argument(
+            '--parallel', action='store_true',
+            help='Run all the test cases on a process pool, and summarize them')
+    parser.add_argument(
+            '--workers', type=int, default=os.cpu_count(),
+            help='Number of processes of the parallel run')
+    parser.add_argument(
+            '--timeout', type=float,
+            help='Maximum time of a test case, in seconds')
+    parser.add_argument(
+            '--benchmark', action='store_true',
+            help='Benchmark the puzzles on generated inputs instead of testing them')
+    parser.add_argument(
+            '--sizes', type=int, nargs='+', default=[10**3, 10**4, 10**5],
+            help='Number of records of the generated inputs')
+    parser.add_argument(
+            '--repeat', type=int, default=5,
+            help='Number of timed runs per input')
+    parser.add_argument(
+            '--output', metavar='FILE',
+            help='Save the benchmark reports as JSON')
+    parser.add_argument(
+            '--baseline', metavar='FILE',
+            help='Compare the benchmark reports with saved ones, '
+            'exit with status 1 on regressions')
+    parser.add_argument(
+            '--tolerance', type=float, default=0.5,
+            help='Relative increase of time or memory reported as a regression')
 
     return parser
 
-def get_test_class(puzzle_number):
-    """ Return the class of one puzzle """
-    return globals()['TestPuzzle{}'.format(puzzle_number)]
+def get_test_class(puzzle_number, year=2018):
+    """ Return the class of one puzzle, TestPuzzleN for 2018 and
+    TestYYYYPuzzleN for the other years """
+    if year == 2018:
+        return globals()['TestPuzzle{}'.format(puzzle_number)]
+    return globals()['Test{}Puzzle{}'.format(year, puzzle_number)]
 
 
 if __name__ == '__main__':
-    args = get_parser().parse_args()
-    tester = get_test_class(args.puzzle_number)()
-    tester.run()
+    parser = get_parser()
+    args = parser.parse_args()
+    tested = [
+            test_class.DAY for test_class in get_test_classes()
+            if test_class.YEAR == args.year]
+    if not args.puzzle_number:
+        args.puzzle_number = tested
+    for puzzle_number in args.puzzle_number:
+        if puzzle_number not in tested:
+            parser.error("invalid puzzle number: {}".format(puzzle_number))
+    if args.benchmark:
+        if args.year != 2018:
+            parser.error("only the puzzles of 2018 have input generators")
+        sys.exit(run_benchmarks(args))
+    if args.parallel:
+        sys.exit(run_parallel([
+            test_class for test_class in get_test_classes()
+            if test_class.YEAR == args.year
+            and test_class.DAY in args.puzzle_number], args.workers, args.timeout))
+    for puzzle_number in args.puzzle_number:
+        tester = get_test_class(puzzle_number, args.year)()
+        tester.run(args.timeout)